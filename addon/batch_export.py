@@ -0,0 +1,176 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+    Headless batch export of driving scenarios from a list of .blend files.
+
+    Each .blend file is exported by a background Blender worker process which
+    runs the dsc.export_driving_scenario operator. The workers are fanned out
+    over a pool and a JSON report with per file timing and failures is
+    written at the end. This script does not need Blender's Python, run it
+    with any Python 3 interpreter:
+
+        python3 batch_export.py --blender /opt/blender/blender \\
+            --output-dir /tmp/export --jobs 8 scenario_1.blend scenario_2.blend
+'''
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Name of the add-on module as installed from the release .zip archive
+addon_module_default = 'blender-driving-scenario-creator'
+
+# Python expression executed inside each background Blender worker, the
+# operator is cancelled if it reported errors, raising then lets Blender exit
+# with the code given by --python-exit-code
+worker_expression = ('import bpy\n'
+    'result = bpy.ops.dsc.export_driving_scenario(directory={}, mesh_file_type={})\n'
+    'if result != {{\'FINISHED\'}}:\n'
+    '    raise RuntimeError(\'Export reported errors.\')\n')
+
+# Statistics file written by the export operator into the export directory
+statistics_file_name = 'bdsc_export_statistics.json'
+
+
+def export_blend_file(blender, addon_module, blend_path, directory, mesh_file_type, timeout):
+    '''
+        Export a single .blend file with a background Blender process and
+        return a dictionary describing the result.
+    '''
+    directory.mkdir(parents=True, exist_ok=True)
+    # Statistics of an earlier export must not be taken for this one
+    (directory / statistics_file_name).unlink(missing_ok=True)
+    command = [blender, '--background', str(blend_path),
+               '--addons', addon_module,
+               '--python-exit-code', '1',
+               '--python-expr', worker_expression.format(
+                   repr(str(directory) + os.sep), repr(mesh_file_type))]
+    result = {
+        'blend_file': str(blend_path),
+        'directory': str(directory),
+        'success': False,
+        'returncode': None,
+        'num_export_errors': None,
+        'time': 0.0,
+        'error': None,
+    }
+    time_start = time.perf_counter()
+    try:
+        process = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        result['returncode'] = process.returncode
+        result['success'] = process.returncode == 0
+        if not result['success']:
+            # Keep the end of the output which usually contains the traceback
+            result['error'] = (process.stderr or process.stdout)[-2000:]
+    except FileNotFoundError:
+        result['error'] = 'Blender executable "{}" not found.'.format(blender)
+    except subprocess.TimeoutExpired:
+        result['error'] = 'Export timed out after {} s.'.format(timeout)
+    result['time'] = time.perf_counter() - time_start
+    result['num_export_errors'] = get_num_export_errors(directory)
+    return result
+
+def get_num_export_errors(directory):
+    '''
+        Return the number of errors reported by the export operator according
+        to its statistics file or None if the export did not finish.
+    '''
+    try:
+        statistics = json.loads((directory / statistics_file_name).read_text())
+    except (OSError, ValueError):
+        return None
+    return statistics['counts'].get('errors', 0)
+
+def get_export_directories(output_dir, blend_paths):
+    '''
+        Return one export directory for each .blend file named like the file.
+        Files with the same name get a suffix derived from their full path to
+        not overwrite each other's exports.
+    '''
+    stems = [blend_path.stem for blend_path in blend_paths]
+    directories = []
+    for blend_path in blend_paths:
+        if stems.count(blend_path.stem) > 1:
+            path_hash = hashlib.sha1(str(blend_path.resolve()).encode()).hexdigest()[:8]
+            directories.append(output_dir / (blend_path.stem + '_' + path_hash))
+        else:
+            directories.append(output_dir / blend_path.stem)
+    return directories
+
+def export_blend_files(blender, addon_module, blend_paths, output_dir, mesh_file_type,
+                       num_workers, timeout):
+    '''
+        Export all .blend files to subdirectories of the output directory
+        (one per file, named like the file) using a pool of background
+        Blender processes. Return the report dictionary.
+    '''
+    time_start = time.perf_counter()
+    # The same file listed twice would be exported twice into one directory
+    blend_paths = list(dict.fromkeys(blend_path.resolve() for blend_path in blend_paths))
+    directories = get_export_directories(output_dir, blend_paths)
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        futures = []
+        for blend_path, directory in zip(blend_paths, directories):
+            futures.append(executor.submit(export_blend_file, blender, addon_module,
+                blend_path, directory, mesh_file_type, timeout))
+        results = [future.result() for future in futures]
+    num_failed = sum(1 for result in results if not result['success'])
+    return {
+        'num_files': len(results),
+        'num_failed': num_failed,
+        'num_workers': num_workers,
+        'time_total': time.perf_counter() - time_start,
+        'files': results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Export driving scenarios from .blend files with background Blender workers.')
+    parser.add_argument('blend_files', nargs='+', type=pathlib.Path,
+        help='.blend files to export')
+    parser.add_argument('--output-dir', type=pathlib.Path, required=True,
+        help='directory which receives one export directory per .blend file')
+    parser.add_argument('--blender', default='blender',
+        help='path to the Blender executable (default: blender from PATH)')
+    parser.add_argument('--addon-module', default=addon_module_default,
+        help='module name of the installed add-on (default: %(default)s)')
+    parser.add_argument('--mesh-file-type', default='osgb', choices=['fbx', 'glb', 'gltf', 'osgb'],
+        help='3D model file type (default: %(default)s)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+        help='number of parallel Blender workers (default: number of CPUs)')
+    parser.add_argument('--timeout', type=float, default=None,
+        help='timeout in seconds for a single export')
+    parser.add_argument('--report', type=pathlib.Path, default=None,
+        help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    report = export_blend_files(args.blender, args.addon_module, args.blend_files,
+        args.output_dir, args.mesh_file_type, max(1, args.jobs), args.timeout)
+    report_json = json.dumps(report, indent=4)
+    if args.report is None:
+        print(report_json)
+    else:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(report_json)
+    return 1 if report['num_failed'] > 0 else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
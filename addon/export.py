@@ -13,15 +13,24 @@
 
 import bpy
 from . import helpers
+from . export_statistics import DSC_export_statistics
 
 from scenariogeneration import xosc
 from scenariogeneration import xodr
+from scenariogeneration.helpers import prettify
 
 from mathutils import Vector
 from math import pi
 
+from array import array
+import hashlib
+import os
 import pathlib
+import shutil
 import subprocess
+import time
+
+from concurrent.futures import ThreadPoolExecutor
 
 mapping_lane_type = {
     'driving': xodr.LaneType.driving,
@@ -75,6 +84,13 @@ mapping_contact_point = {
     'cp_end_r': xodr.ContactPoint.end,
 }
 
+# Custom property hashes of the OpenDRIVE objects and the XML elements of all
+# roads and junctions of the last export, used to only rebuild changed elements
+xodr_export_cache = {
+    'hashes': {},
+    'elements': {},
+}
+
 class DSC_OT_export(bpy.types.Operator):
     bl_idname = 'dsc.export_driving_scenario'
     bl_label = 'Export driving scenario'
@@ -92,8 +108,34 @@ class DSC_OT_export(bpy.types.Operator):
         default='osgb',
     )
 
+    incremental_opendrive : bpy.props.BoolProperty(
+        name='Incremental OpenDRIVE export',
+        description='Only rebuild OpenDRIVE roads and junctions changed since the last export. '
+            'Keeps the XML of all roads and junctions in memory',
+        default=True,
+    )
+
+    export_lods : bpy.props.BoolProperty(
+        name='Export mesh levels of detail',
+        description='Additionally export one scenegraph file for each road mesh level of detail '
+            '(export_lod1, export_lod2, ...)',
+        default=False,
+    )
+
+    trace_memory : bpy.props.BoolProperty(
+        name='Trace memory usage',
+        description='Measure the peak memory usage of each export phase. Slows down the export',
+        default=False,
+    )
+
     dsc_export_filename = 'bdsc_export'
 
+    # Increase to invalidate all models in the vehicle model cache
+    model_cache_version = 1
+
+    # Maximum number of osgconv processes running at the same time
+    num_workers_osgconv = os.cpu_count() or 1
+
     @classmethod
     def poll(cls, context):
         # if helpers.collection_exists(['OpenDRIVE']):
@@ -107,17 +149,65 @@ class DSC_OT_export(bpy.types.Operator):
         row = layout.row()
         row.label(text="Mesh file:")
         row.prop(self, "mesh_file_type", expand=True)
+        row = layout.row()
+        row.prop(self, "incremental_opendrive")
+        row = layout.row()
+        row.prop(self, "export_lods")
+        row = layout.row()
+        row.prop(self, "trace_memory")
 
     def execute(self, context):
-        self.export_vehicle_models(context)
-        self.export_scenegraph_file()
-        self.export_openscenario()
+        # .obj files waiting for conversion to .osgb
+        self.osgb_conversions = []
+        self.statistics = DSC_export_statistics(self.trace_memory)
+        self.statistics.start()
+        try:
+            with self.statistics.phase('vehicle_models'):
+                self.export_vehicle_models(context)
+            with self.statistics.phase('scenegraph_mesh'):
+                self.export_scenegraph_file()
+            with self.statistics.phase('osgconv'):
+                self.convert_all_to_osgb()
+            with self.statistics.phase('copy_models'):
+                self.copy_cached_models()
+            with self.statistics.phase('xosc'):
+                self.export_openscenario()
+        finally:
+            # Also stops memory tracing if the export fails
+            self.statistics.stop()
+        self.write_statistics()
+        if self.statistics.counts.get('errors', 0) > 0:
+            # Let callers like the batch export detect failed exports
+            return {'CANCELLED'}
         return {'FINISHED'}
 
     def invoke(self, context, event):
         context.window_manager.fileselect_add(self)
         return {'RUNNING_MODAL'}
 
+    def report_error(self, message):
+        '''
+            Report an error and count it in the export statistics.
+        '''
+        self.statistics.count('errors')
+        self.report({'ERROR'}, message)
+
+    def write_statistics(self):
+        '''
+            Write the export statistics to a JSON file next to the exported
+            files and report a short summary.
+        '''
+        file_path = pathlib.Path(self.directory) / (self.dsc_export_filename + '_statistics.json')
+        self.statistics.write_json(file_path, {
+            'addon_version': helpers.get_addon_version(),
+            'blender_version': bpy.app.version_string,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'mesh_file_type': self.mesh_file_type,
+            'incremental_opendrive': self.incremental_opendrive,
+            'export_lods': self.export_lods,
+        })
+        self.report({'INFO'}, self.statistics.get_summary())
+
     def export_scenegraph_file(self):
         '''
             Export the scene mesh to file
@@ -132,33 +222,71 @@ class DSC_OT_export(bpy.types.Operator):
                 for obj in child.objects:
                     obj.select_set(False)
         self.export_mesh(file_path)
+        if self.export_lods:
+            self.export_scenegraph_lod_files(file_path)
         bpy.ops.object.select_all(action='DESELECT')
 
+    def export_scenegraph_lod_files(self, file_path):
+        '''
+            Export one scenegraph file for each level of detail of the road
+            meshes. The meshes of the selected roads are temporarily swapped
+            with their meshes of reduced detail. Roads with fewer levels use
+            their coarsest level, objects without levels their own mesh.
+        '''
+        objs_lods = {obj: helpers.get_mesh_lods(obj) for obj in bpy.context.selected_objects
+            if obj.type == 'MESH'}
+        objs_lods = {obj: mesh_lods for obj, mesh_lods in objs_lods.items() if len(mesh_lods) > 0}
+        num_lods = max((len(mesh_lods) for mesh_lods in objs_lods.values()), default=0)
+        for idx_lod in range(1, num_lods + 1):
+            meshes_original = {}
+            for obj, mesh_lods in objs_lods.items():
+                meshes_original[obj] = obj.data
+                obj.data = mesh_lods[min(idx_lod, len(mesh_lods)) - 1]
+            try:
+                self.export_mesh(file_path.with_name('export_lod' + str(idx_lod) + file_path.suffix))
+            finally:
+                for obj, mesh in meshes_original.items():
+                    obj.data = mesh
+            self.statistics.count('scenegraph_lods')
+
     def export_vehicle_models(self, context):
         '''
-            Export vehicle models to files.
+            Export vehicle models to files. Models are written to a persistent
+            cache addressed by a hash of the model, identical models are only
+            exported once and shared by all vehicles using them.
         '''
         model_dir = pathlib.Path(self.directory) / 'models' / 'car.obj'
         model_dir.parent.mkdir(parents=True, exist_ok=True)
         catalog_path = pathlib.Path(self.directory) / 'catalogs' / 'vehicles' / 'VehicleCatalog.xosc'
         catalog_path.parent.mkdir(parents=True, exist_ok=True)
+        model_cache_dir = self.get_model_cache_dir()
+        # File names of the cached models used in this export
+        self.model_files_cached = set()
         # Select a car
         bpy.ops.object.select_all(action='DESELECT')
         if helpers.collection_exists(['OpenSCENARIO','dynamic_objects']):
-            catalog_file_created = False
+            catalog = None
             for obj in bpy.data.collections['OpenSCENARIO'].children['dynamic_objects'].objects:
-                print('Export object model for', obj.name)
-                model_path = pathlib.Path(self.directory) / 'models' / str(obj.name)
-                # Create a temporary copy without transform
-                obj_export = obj.copy()
-                helpers.link_object_openscenario(context, obj_export, subcategory=None)
-                obj_export.select_set(True)
-                bpy.ops.object.location_clear()
-                bpy.ops.object.rotation_clear()
-                # Export then delete copy
-                self.export_mesh(model_path)
-                bpy.ops.object.delete()
-                self.convert_to_osgb(model_path)
+                self.statistics.count('vehicles')
+                model_hash = self.get_model_hash(obj)
+                model_file_name = model_hash + '.' + self.mesh_file_type
+                if model_file_name in self.model_files_cached \
+                        or (model_cache_dir / model_file_name).exists():
+                    print('Use cached object model for', obj.name)
+                else:
+                    print('Export object model for', obj.name)
+                    self.statistics.count('vehicle_models_exported')
+                    model_path = model_cache_dir / model_hash
+                    # Create a temporary copy without transform
+                    obj_export = obj.copy()
+                    helpers.link_object_openscenario(context, obj_export, subcategory=None)
+                    obj_export.select_set(True)
+                    bpy.ops.object.location_clear()
+                    bpy.ops.object.rotation_clear()
+                    # Export then delete copy
+                    self.export_mesh(model_path)
+                    bpy.ops.object.delete()
+                self.model_files_cached.add(model_file_name)
                 # Add vehicle to vehicle catalog
                 # TODO store in and read parameters from object
                 bounding_box = xosc.BoundingBox(2,5,1.8,2.0,0,0.9)
@@ -166,16 +294,67 @@ class DSC_OT_export(bpy.types.Operator):
                 axle_rear = xosc.Axle(0,0.8,1.525,0,0.4)
                 car = xosc.Vehicle(obj.name,mapping_object_type[obj['dsc_type']],
                     bounding_box,axle_front,axle_rear,69,10,10)
-                car.add_property_file('../models/' + obj.name + '.' + self.mesh_file_type)
+                car.add_property_file('../models/' + model_file_name)
                 car.add_property('control','internal')
                 car.add_property('model_id','0')
-                if not catalog_file_created:
+                if catalog is None:
                     # Create new catalog with first vehicle
-                    car.dump_to_catalog(catalog_path,'VehicleCatalog',
+                    catalog = xosc.CatalogFile()
+                    catalog.create_catalog(catalog_path,'VehicleCatalog',
                         'DSC vehicle catalog','Blender Driving Scenario Creator')
-                    catalog_file_created = True
-                else:
-                    car.append_to_catalog(catalog_path)
+                catalog.add_to_catalog(car)
+            # Write all vehicles to the catalog file at once
+            if catalog is not None:
+                catalog.dump()
+
+    def get_model_cache_dir(self):
+        '''
+            Return the directory of the persistent vehicle model cache.
+        '''
+        return pathlib.Path(bpy.utils.user_resource('DATAFILES',
+            path='driving_scenario_creator_model_cache', create=True))
+
+    def get_model_hash(self, obj):
+        '''
+            Return a hash of everything that ends up in an exported vehicle
+            model: mesh data, scale, modifiers, materials and target format.
+        '''
+        mesh = obj.data
+        model_hash = hashlib.sha256()
+        model_hash.update(repr((self.model_cache_version, bpy.app.version,
+            self.mesh_file_type, tuple(obj.scale))).encode())
+        vertices_co = array('f', [0.0]) * (3 * len(mesh.vertices))
+        mesh.vertices.foreach_get('co', vertices_co)
+        loops_vertex_index = array('i', [0]) * len(mesh.loops)
+        mesh.loops.foreach_get('vertex_index', loops_vertex_index)
+        polygons_loop_total = array('i', [0]) * len(mesh.polygons)
+        mesh.polygons.foreach_get('loop_total', polygons_loop_total)
+        polygons_material_index = array('i', [0]) * len(mesh.polygons)
+        mesh.polygons.foreach_get('material_index', polygons_material_index)
+        for data in [vertices_co, loops_vertex_index, polygons_loop_total, polygons_material_index]:
+            model_hash.update(data.tobytes())
+        for material in mesh.materials:
+            if material is None:
+                model_hash.update(b'None')
+            else:
+                model_hash.update(repr((material.name, tuple(material.diffuse_color))).encode())
+        for modifier in obj.modifiers:
+            model_hash.update(repr((modifier.type, modifier.show_render)).encode())
+        return model_hash.hexdigest()[:32]
+
+    def copy_cached_models(self):
+        '''
+            Copy the cached models used by the vehicle catalog to the export
+            directory.
+        '''
+        model_cache_dir = self.get_model_cache_dir()
+        model_dir = pathlib.Path(self.directory) / 'models'
+        for model_file_name in self.model_files_cached:
+            model_path_cached = model_cache_dir / model_file_name
+            if model_path_cached.exists():
+                shutil.copyfile(model_path_cached, model_dir / model_file_name)
+            else:
+                self.report_error('Vehicle model {} missing in model cache.'.format(model_file_name))
 
     def export_mesh(self, file_path):
         '''
@@ -184,7 +363,6 @@ class DSC_OT_export(bpy.types.Operator):
         if self.mesh_file_type == 'osgb':
             # Since Blender has no native .osgb support export .obj and then convert
             file_path_obj = file_path.with_suffix('.obj')
-            file_path_mtl = file_path.with_suffix('.mtl')
             file_path_obj.parent.mkdir(parents=True, exist_ok=True)
             bpy.ops.export_scene.obj(filepath=str(file_path_obj), check_existing=True,
                                      filter_glob='*.obj,*.mtl', use_selection=True, use_animation=False,
@@ -194,10 +372,9 @@ class DSC_OT_export(bpy.types.Operator):
                                      use_vertex_groups=False, use_blen_objects=True, group_by_object=False,
                                      group_by_material=False, keep_vertex_order=False, global_scale=1.0,
                                      path_mode='RELATIVE', axis_forward='-Z', axis_up='Y')
-            self.convert_to_osgb(file_path_obj)
-            # Remove mtl and obj files
-            file_path_obj.unlink()
-            file_path_mtl.unlink()
+            # Conversion (and removal of the .obj and .mtl files) is done
+            # later for all files at once
+            self.osgb_conversions.append(file_path_obj)
         elif self.mesh_file_type == 'fbx':
             file_path = file_path.with_suffix('.fbx')
             file_path.parent.mkdir(parents=True, exist_ok=True)
@@ -256,191 +433,92 @@ class DSC_OT_export(bpy.types.Operator):
                                       will_save_settings=False, filter_glob='*.glb;*.gltf')
 
     def convert_to_osgb(self, input_file_path):
+        '''
+            Convert a 3D model file to .osgb with osgconv. Return True if the
+            conversion succeeded and the conversion time in seconds.
+        '''
+        time_start = time.perf_counter()
         try:
-            subprocess.run(['osgconv', str(input_file_path), str(input_file_path.with_suffix('.osgb'))])
+            process = subprocess.run(['osgconv', str(input_file_path),
+                str(input_file_path.with_suffix('.osgb'))])
+            success = process.returncode == 0
         except FileNotFoundError:
-            self.report({'ERROR'}, 'Executable \"osgconv\" required to produce .osgb scenegraph file. '
-                'Try installing openscenegraph.')
+            success = False
+        return success, time.perf_counter() - time_start
+
+    def get_obj_content_hash(self, file_path_obj):
+        '''
+            Return a hash of an .obj file and its .mtl file which ignores
+            comments, object names and the .mtl file name, so that identical
+            meshes exported under different names get the same hash.
+        '''
+        content_hash = hashlib.sha256()
+        with open(file_path_obj, 'rb') as file_obj:
+            for line in file_obj:
+                if line.startswith((b'#', b'o ', b'mtllib ')):
+                    continue
+                content_hash.update(line)
+        file_path_mtl = file_path_obj.with_suffix('.mtl')
+        if file_path_mtl.exists():
+            with open(file_path_mtl, 'rb') as file_mtl:
+                for line in file_mtl:
+                    if line.startswith(b'#'):
+                        continue
+                    content_hash.update(line)
+        return content_hash.hexdigest()
+
+    def convert_all_to_osgb(self):
+        '''
+            Convert all queued .obj files to .osgb using a bounded number of
+            parallel osgconv processes. Identical inputs are converted only
+            once and the result is copied for the others. Finally remove the
+            .obj and .mtl files of all successful conversions.
+        '''
+        if len(self.osgb_conversions) == 0:
+            return
+        # Group identical input files, the first file of each group is converted
+        groups = {}
+        for file_path_obj in self.osgb_conversions:
+            groups.setdefault(self.get_obj_content_hash(file_path_obj), []).append(file_path_obj)
+        groups = list(groups.values())
+        self.statistics.count('osgb_files', len(self.osgb_conversions))
+        self.statistics.count('osgb_conversions', len(groups))
+        time_start = time.perf_counter()
+        num_workers = min(len(groups), self.num_workers_osgconv)
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            results = list(executor.map(self.convert_to_osgb, [group[0] for group in groups]))
+        time_wall = time.perf_counter() - time_start
+        # Distribute the results and estimate the time a sequential conversion
+        # of every single file would have taken
+        time_sequential = 0.0
+        all_success = True
+        for group, (success, time_conversion) in zip(groups, results):
+            time_sequential += len(group) * time_conversion
+            if success:
+                for file_path_obj in group[1:]:
+                    shutil.copyfile(group[0].with_suffix('.osgb'), file_path_obj.with_suffix('.osgb'))
+                for file_path_obj in group:
+                    file_path_obj.unlink()
+                    file_path_obj.with_suffix('.mtl').unlink(missing_ok=True)
+            else:
+                # Keep the .obj and .mtl files to allow a manual conversion
+                all_success = False
+        self.osgb_conversions = []
+        if not all_success:
+            self.report_error('Conversion to .osgb with \"osgconv\" failed. Executable \"osgconv\" '
+                'is required to produce .osgb scenegraph files, try installing openscenegraph.')
+        else:
+            self.report({'INFO'}, 'Converted {} .osgb files ({} unique) in {:.2f} s, '
+                'saved {:.2f} s compared to sequential conversion.'.format(
+                sum(len(group) for group in groups), len(groups), time_wall,
+                max(0.0, time_sequential - time_wall)))
 
     def export_openscenario(self):
         # OpenDRIVE (referenced by OpenSCENARIO)
         xodr_path = pathlib.Path(self.directory) / 'xodr' / (self.dsc_export_filename + '.xodr')
         xodr_path.parent.mkdir(parents=True, exist_ok=True)
-        odr = xodr.OpenDrive('blender_dsc')
-        roads = []
-        # Create OpenDRIVE roads from object collection
-        if helpers.collection_exists(['OpenDRIVE']):
-            for obj in bpy.data.collections['OpenDRIVE'].objects:
-                if obj.name.startswith('road'):
-                    planview = xodr.PlanView()
-                    planview.set_start_point(obj['geometry']['point_start'][0],
-                        obj['geometry']['point_start'][1],obj['geometry']['heading_start'])
-                    if obj['geometry']['curve'] == 'line':
-                        geometry = xodr.Line(obj['geometry']['length'])
-                    if obj['geometry']['curve'] == 'arc':
-                        geometry = xodr.Arc(obj['geometry']['curvature_start'],
-                            length=obj['geometry']['length'])
-                    if obj['geometry']['curve'] == 'spiral':
-                        geometry = xodr.Spiral(obj['geometry']['curvature_start'],
-                            obj['geometry']['curvature_end'], length=obj['geometry']['length'])
-                    planview.add_geometry(geometry)
-                    lanes = self.create_lanes(obj)
-                    road = xodr.Road(obj['id_odr'],planview,lanes)
-                    self.add_elevation_profiles(obj, road)
-                    # Add road level linking
-                    if 'link_predecessor_id_l' in obj:
-                        element_type = self.get_element_type_by_id(obj['link_predecessor_id_l'])
-                        if obj['link_predecessor_cp_l'] == 'cp_start_l' or \
-                            obj['link_predecessor_cp_l'] == 'cp_start_r':
-                            cp_type = xodr.ContactPoint.start
-                        elif obj['link_predecessor_cp_l'] == 'cp_end_l' or \
-                                obj['link_predecessor_cp_l'] == 'cp_end_r':
-                            cp_type = xodr.ContactPoint.end
-                        else:
-                            cp_type = None
-                        if not 'id_direct_junction_start' in obj:
-                            road.add_predecessor(element_type, obj['link_predecessor_id_l'], cp_type)
-                    if 'link_predecessor_id_r' in obj:
-                        element_type = self.get_element_type_by_id(obj['link_predecessor_id_r'])
-                        if obj['link_predecessor_cp_r'] == 'cp_start_l' or \
-                            obj['link_predecessor_cp_r'] == 'cp_start_r':
-                            cp_type = xodr.ContactPoint.start
-                        elif obj['link_predecessor_cp_r'] == 'cp_end_l' or \
-                                obj['link_predecessor_cp_r'] == 'cp_end_r':
-                            cp_type = xodr.ContactPoint.end
-                        else:
-                            cp_type = None
-                        if not 'id_direct_junction_start' in obj:
-                            road.add_predecessor(element_type, obj['link_predecessor_id_r'], cp_type)
-                    if 'link_successor_id_l' in obj:
-                        element_type = self.get_element_type_by_id(obj['link_successor_id_l'])
-                        if obj['link_successor_cp_l'] == 'cp_start_l' or \
-                            obj['link_successor_cp_l'] == 'cp_start_r':
-                            cp_type = xodr.ContactPoint.start
-                        elif obj['link_successor_cp_l'] == 'cp_end_l' or \
-                                obj['link_successor_cp_l'] == 'cp_end_r':
-                            cp_type = xodr.ContactPoint.end
-                        else:
-                            cp_type = None
-                        if not 'id_direct_junction_end' in obj:
-                            road.add_successor(element_type, obj['link_successor_id_l'], cp_type)
-                    if 'link_successor_id_r' in obj:
-                        element_type = self.get_element_type_by_id(obj['link_successor_id_r'])
-                        if obj['link_successor_cp_r'] == 'cp_start_l' or \
-                            obj['link_successor_cp_r'] == 'cp_start_r':
-                            cp_type = xodr.ContactPoint.start
-                        elif obj['link_successor_cp_r'] == 'cp_end_l' or \
-                                obj['link_successor_cp_r'] == 'cp_end_r':
-                            cp_type = xodr.ContactPoint.end
-                        else:
-                            cp_type = None
-                        if not 'id_direct_junction_end' in obj:
-                            road.add_successor(element_type, obj['link_successor_id_r'], cp_type)
-                    if 'id_direct_junction_start' in obj:
-                        # Connect to direction junction attached to the other (split) road
-                        road.add_predecessor(xodr.ElementType.junction, obj['id_direct_junction_start'])
-                    if 'id_direct_junction_end' in obj:
-                        # Connect to direction junction attached to the other (split) road
-                        road.add_successor(xodr.ElementType.junction, obj['id_direct_junction_end'])
-                    print('Add road with ID', obj['id_odr'])
-                    odr.add_road(road)
-                    roads.append(road)
-            # Now that all roads exist create direct junctions
-            for obj in bpy.data.collections['OpenDRIVE'].objects:
-                if obj.name.startswith('road'):
-                    if obj['road_split_type'] != 'none':
-                        if ('link_predecessor_id_l' in obj and 'link_predecessor_id_r' in obj) \
-                                or ('link_successor_id_l' in obj and 'link_successor_id_r' in obj):
-                            if obj['road_split_type'] == 'end':
-                                junction_id = obj['id_direct_junction_end']
-                                road_out_id_l = obj['link_successor_id_l']
-                                road_out_cp_l = obj['link_successor_cp_l']
-                                road_out_id_r = obj['link_successor_id_r']
-                                road_out_cp_r = obj['link_successor_cp_r']
-                                road_in_cp_l = 'cp_end_l'
-                                road_in_cp_r = 'cp_end_r'
-                            elif obj['road_split_type'] == 'start':
-                                junction_id = obj['id_direct_junction_start']
-                                road_out_id_l = obj['link_predecessor_id_l']
-                                road_out_cp_l = obj['link_predecessor_cp_l']
-                                road_out_id_r = obj['link_predecessor_id_r']
-                                road_out_cp_r = obj['link_predecessor_cp_r']
-                                road_in_cp_l = 'cp_start_l'
-                                road_in_cp_r = 'cp_start_r'
-                            dj_creator = xodr.DirectJunctionCreator(id=junction_id,
-                                name='direct_junction_' + str(junction_id))
-                            road_obj_in = helpers.get_object_xodr_by_id(obj['id_odr'])
-                            road_obj_out_l = helpers.get_object_xodr_by_id(road_out_id_l)
-                            road_obj_out_r = helpers.get_object_xodr_by_id(road_out_id_r)
-                            lane_ids_road_in_l, lane_ids_road_out_l = \
-                                self.get_lanes_ids_to_link(road_obj_in, road_in_cp_l, road_obj_out_l, road_out_cp_l)
-                            lane_ids_road_in_r, lane_ids_road_out_r = \
-                                self.get_lanes_ids_to_link(road_obj_in, road_in_cp_r, road_obj_out_r, road_out_cp_r)
-                            road_in = self.get_road_by_id(roads, obj['id_odr'])
-                            road_out_l = self.get_road_by_id(roads, road_out_id_l)
-                            road_out_r = self.get_road_by_id(roads, road_out_id_r)
-                            dj_creator.add_connection(road_in, road_out_l, lane_ids_road_in_l, lane_ids_road_out_l)
-                            dj_creator.add_connection(road_in, road_out_r, lane_ids_road_in_r, lane_ids_road_out_r)
-                            odr.add_junction(dj_creator.junction)
-                        else:
-                            self.report({'ERROR'}, 'Export of direct junction connected to road with ID {}'
-                                ' failed due to missing connection.'.format(obj['id_odr']))
-        # Add lane level linking for all roads
-        self.link_lanes(roads)
-        # Create OpenDRIVE junctions from object collection
-        num_junctions = 0
-        if helpers.collection_exists(['OpenDRIVE']):
-            for obj in bpy.data.collections['OpenDRIVE'].objects:
-                # Export generic junctions
-                if obj.name.startswith('junction_area'):
-                    incoming_roads = []
-                    junction_id = obj['id_odr']
-                    for joint in obj['joints']:
-                        inc_road = xodr.get_road_by_id(roads, joint['id_incoming'])
-                        if(inc_road != None):
-                            incoming_roads.append(inc_road)
-                        else:
-                            self.report({'WARNING'}, 'Junction with ID {}'
-                            ' is missing a connection.'.format(obj['id_odr']))
-                    # Find and export connecting roads of this junction
-                    junction_roads = []
-                    for obj_jcr in bpy.data.collections['OpenDRIVE'].objects:
-                        if obj_jcr.name.startswith('junction_connecting_road'):
-                            if obj_jcr['id_junction'] == junction_id:
-                                if 'link_predecessor_id_l' in obj_jcr and 'link_successor_id_l' in obj_jcr:
-                                    # Create a junction connecting road
-                                    # TODO for now we use a single spiral, later we should use arc - spiral - arc
-                                    planview = xodr.PlanView()
-                                    planview.set_start_point(obj_jcr['geometry']['point_start'][0],
-                                        obj_jcr['geometry']['point_start'][1],obj_jcr['geometry']['heading_start'])
-                                    geometry = xodr.Spiral(obj_jcr['geometry']['curvature_start'],
-                                        obj_jcr['geometry']['curvature_end'], length=obj_jcr['geometry']['length'])
-                                    planview.add_geometry(geometry)
-                                    lanes = self.create_lanes(obj_jcr)
-                                    road = xodr.Road(obj_jcr['id_odr'],planview,lanes, road_type=junction_id)
-                                    self.add_elevation_profiles(obj_jcr, road)
-                                    # Connect the junction connecting road to incoming and connecting roads
-                                    incoming_road = self.get_road_by_id(roads, obj_jcr['link_predecessor_id_l'])
-                                    contact_point = mapping_contact_point[obj_jcr['link_predecessor_cp_l']]
-                                    road.add_predecessor(xodr.ElementType.road, incoming_road.id, contact_point)
-                                    xodr.create_lane_links(road, incoming_road)
-                                    incoming_road = self.get_road_by_id(roads, obj_jcr['link_successor_id_l'])
-                                    contact_point = mapping_contact_point[obj_jcr['link_successor_cp_l']]
-                                    road.add_successor(xodr.ElementType.road, incoming_road.id, contact_point)
-                                    xodr.create_lane_links(road, incoming_road)
-                                    junction_roads.append(road)
-                                    # Create lane links with incoming roads
-                    # Finally create the junction
-                    junction = xodr.create_junction(
-                        junction_roads, junction_id, incoming_roads, 'junction_' + str(junction_id))
-                    num_junctions += 1
-                    print('Add junction with ID', junction_id)
-                    odr.add_junction(junction)
-                    # Junction connecting roads also need to be registered as "normal" roads
-                    for road in junction_roads:
-                        odr.add_road(road)
-        odr.adjust_startpoints()
-        odr.write_xml(str(xodr_path))
+        with self.statistics.phase('xodr'):
+            self.export_opendrive(xodr_path)
 
         # OpenSCENARIO
         xosc_path = pathlib.Path(self.directory) / 'xosc' / (self.dsc_export_filename + '.xosc')
@@ -476,11 +554,12 @@ class DSC_OT_export(bpy.types.Operator):
         if helpers.collection_exists(['OpenSCENARIO','trajectories']):
             for obj in bpy.data.collections['OpenSCENARIO'].children['trajectories'].objects:
                 if 'dsc_type' in obj and obj['dsc_type'] == 'trajectory':
+                    self.statistics.count('trajectories')
                     if obj['dsc_subtype'] == 'polyline':
                         speed_kmh = helpers.get_obj_custom_property('OpenSCENARIO', 'dynamic_objects',
                             obj['owner_name'], 'speed_initial')
                         if speed_kmh == None:
-                            self.report({'ERROR'}, 'Trajectory ' + obj.name + ' owner not found!')
+                            self.report_error('Trajectory ' + obj.name + ' owner not found!')
                             break
                         times, positions = self.calculate_trajectory_values(obj, helpers.kmh_to_ms(speed_kmh))
                         shape = xosc.Polyline(times, positions)
@@ -533,30 +612,416 @@ class DSC_OT_export(bpy.types.Operator):
             entities,storyboard,road,catalog_vehicles)
         scenario.write_xml(str(xosc_path))
 
+    def export_opendrive(self, xodr_path):
+        '''
+            Export the OpenDRIVE file. Each road and junction is built together
+            with the roads it is linked to and written to the file right away,
+            afterwards these roads are dropped again. This way memory usage
+            does not grow with the size of the road network. Elements which
+            did not change since the last export are taken from the cache.
+        '''
+        # Build ID lookup tables once to avoid scanning the collection per road
+        self.build_id_index()
+        self.find_dirty_elements()
+        xodr_fragments = {}
+        num_elements = 0
+        num_rebuilt = 0
+        with open(xodr_path, 'wb') as file:
+            xodr_start, xodr_end = self.get_opendrive_frame()
+            file.write(xodr_start)
+            for key, phase, create_element in self.get_xodr_elements():
+                if key in self.xodr_keys_dirty:
+                    # Start over without the roads built for the last element
+                    self.roads_by_id = {}
+                    with self.statistics.phase(phase):
+                        element = create_element()
+                    if element is None:
+                        continue
+                    with self.statistics.phase('xodr_write'):
+                        fragment = self.serialize_xodr_element(element)
+                    self.statistics.count(phase)
+                    num_rebuilt += 1
+                else:
+                    fragment = xodr_export_cache['elements'][key]
+                with self.statistics.phase('xodr_write'):
+                    file.write(fragment)
+                num_elements += 1
+                if self.incremental_opendrive:
+                    xodr_fragments[key] = fragment
+            file.write(xodr_end)
+        self.roads_by_id = {}
+        # Only update the cache after a successful export
+        xodr_export_cache['elements'] = xodr_fragments
+        xodr_export_cache['hashes'] = self.xodr_hashes if self.incremental_opendrive else {}
+        self.statistics.count('xodr_elements', num_elements)
+        self.statistics.count('xodr_elements_rebuilt', num_rebuilt)
+        self.report({'INFO'}, 'Rebuilt {} of {} OpenDRIVE roads and junctions.'.format(
+            num_rebuilt, num_elements))
+
+    def get_opendrive_frame(self):
+        '''
+            Return the beginning of the OpenDRIVE file including the header and
+            the end of the file, formatted like by xodr.OpenDrive.write_xml.
+        '''
+        xodr_file = prettify(xodr.OpenDrive('blender_dsc').get_element())
+        idx_end = xodr_file.rindex(b'</OpenDRIVE>')
+        return xodr_file[:idx_end], xodr_file[idx_end:]
+
+    def serialize_xodr_element(self, element):
+        '''
+            Return road or junction formatted like a child of the root element
+            by xodr.OpenDrive.write_xml.
+        '''
+        lines = prettify(element).split(b'\n')
+        # Drop the XML declaration and indent by one level
+        return b''.join(b'    ' + line + b'\n' for line in lines[1:] if line)
+
+    def get_xodr_elements(self):
+        '''
+            Yield a key, the name of the export phase and a function creating
+            the xodr element for all roads and junctions in the order of
+            xodr.OpenDrive.write_xml: roads, junction connecting roads, direct
+            junctions and generic junctions.
+        '''
+        if not helpers.collection_exists(['OpenDRIVE']):
+            return
+        objects = bpy.data.collections['OpenDRIVE'].objects
+        for obj in objects:
+            if obj.name.startswith('road'):
+                yield ('road', obj['id_odr']), 'roads', lambda obj=obj: self.create_road_linked(obj)
+        for obj in objects:
+            if obj.name.startswith('junction_area'):
+                for obj_jcr in self.objects_connecting_roads_by_junction_id.get(obj['id_odr'], []):
+                    if 'link_predecessor_id_l' in obj_jcr and 'link_successor_id_l' in obj_jcr:
+                        yield ('road', obj_jcr['id_odr']), 'junction_connecting_roads', \
+                            lambda obj_jcr=obj_jcr: self.create_junction_connecting_road(obj_jcr)
+        for obj in objects:
+            if obj.name.startswith('road'):
+                if obj['road_split_type'] != 'none':
+                    if ('link_predecessor_id_l' in obj and 'link_predecessor_id_r' in obj) \
+                            or ('link_successor_id_l' in obj and 'link_successor_id_r' in obj):
+                        if obj['road_split_type'] == 'end':
+                            junction_id = obj['id_direct_junction_end']
+                        elif obj['road_split_type'] == 'start':
+                            junction_id = obj['id_direct_junction_start']
+                        yield ('junction', junction_id), 'direct_junctions', \
+                            lambda obj=obj: self.create_direct_junction(obj)
+                    else:
+                        self.report_error('Export of direct junction connected to road with ID {}'
+                            ' failed due to missing connection.'.format(obj['id_odr']))
+        for obj in objects:
+            if obj.name.startswith('junction_area'):
+                yield ('junction', obj['id_odr']), 'generic_junctions', \
+                    lambda obj=obj: self.create_junction(obj)
+
+    def create_road(self, obj):
+        '''
+            Create an xodr road with road level links from a road object and
+            register it for lookup by ID.
+        '''
+        planview = xodr.PlanView()
+        planview.set_start_point(obj['geometry']['point_start'][0],
+            obj['geometry']['point_start'][1],obj['geometry']['heading_start'])
+        if obj['geometry']['curve'] == 'plan_view':
+            # Chain of segments, the PlanView calculates their start points
+            for segment in obj['geometry']['segments']:
+                planview.add_geometry(self.create_geometry(segment))
+        else:
+            planview.add_geometry(self.create_geometry(obj['geometry']))
+        lanes = self.create_lanes(obj)
+        road = xodr.Road(obj['id_odr'],planview,lanes)
+        self.add_elevation_profiles(obj, road)
+        # Add road level linking
+        if 'link_predecessor_id_l' in obj:
+            element_type = self.get_element_type_by_id(obj['link_predecessor_id_l'])
+            if obj['link_predecessor_cp_l'] == 'cp_start_l' or \
+                obj['link_predecessor_cp_l'] == 'cp_start_r':
+                cp_type = xodr.ContactPoint.start
+            elif obj['link_predecessor_cp_l'] == 'cp_end_l' or \
+                    obj['link_predecessor_cp_l'] == 'cp_end_r':
+                cp_type = xodr.ContactPoint.end
+            else:
+                cp_type = None
+            if not 'id_direct_junction_start' in obj:
+                road.add_predecessor(element_type, obj['link_predecessor_id_l'], cp_type)
+        if 'link_predecessor_id_r' in obj:
+            element_type = self.get_element_type_by_id(obj['link_predecessor_id_r'])
+            if obj['link_predecessor_cp_r'] == 'cp_start_l' or \
+                obj['link_predecessor_cp_r'] == 'cp_start_r':
+                cp_type = xodr.ContactPoint.start
+            elif obj['link_predecessor_cp_r'] == 'cp_end_l' or \
+                    obj['link_predecessor_cp_r'] == 'cp_end_r':
+                cp_type = xodr.ContactPoint.end
+            else:
+                cp_type = None
+            if not 'id_direct_junction_start' in obj:
+                road.add_predecessor(element_type, obj['link_predecessor_id_r'], cp_type)
+        if 'link_successor_id_l' in obj:
+            element_type = self.get_element_type_by_id(obj['link_successor_id_l'])
+            if obj['link_successor_cp_l'] == 'cp_start_l' or \
+                obj['link_successor_cp_l'] == 'cp_start_r':
+                cp_type = xodr.ContactPoint.start
+            elif obj['link_successor_cp_l'] == 'cp_end_l' or \
+                    obj['link_successor_cp_l'] == 'cp_end_r':
+                cp_type = xodr.ContactPoint.end
+            else:
+                cp_type = None
+            if not 'id_direct_junction_end' in obj:
+                road.add_successor(element_type, obj['link_successor_id_l'], cp_type)
+        if 'link_successor_id_r' in obj:
+            element_type = self.get_element_type_by_id(obj['link_successor_id_r'])
+            if obj['link_successor_cp_r'] == 'cp_start_l' or \
+                obj['link_successor_cp_r'] == 'cp_start_r':
+                cp_type = xodr.ContactPoint.start
+            elif obj['link_successor_cp_r'] == 'cp_end_l' or \
+                    obj['link_successor_cp_r'] == 'cp_end_r':
+                cp_type = xodr.ContactPoint.end
+            else:
+                cp_type = None
+            if not 'id_direct_junction_end' in obj:
+                road.add_successor(element_type, obj['link_successor_id_r'], cp_type)
+        if 'id_direct_junction_start' in obj:
+            # Connect to direction junction attached to the other (split) road
+            road.add_predecessor(xodr.ElementType.junction, obj['id_direct_junction_start'])
+        if 'id_direct_junction_end' in obj:
+            # Connect to direction junction attached to the other (split) road
+            road.add_successor(xodr.ElementType.junction, obj['id_direct_junction_end'])
+        self.roads_by_id[road.id] = road
+        return road
+
+    def create_road_linked(self, obj):
+        '''
+            Create an xodr road including lane level links to its neighbours.
+        '''
+        road = self.get_road_by_id(obj['id_odr'])
+        with self.statistics.phase('link_lanes'):
+            self.link_lanes(road)
+        with self.statistics.phase('adjust_startpoints'):
+            road.planview.adjust_geometries()
+        print('Add road with ID', obj['id_odr'])
+        return road
+
+    def create_direct_junction(self, obj):
+        '''
+            Create an xodr direct junction for a split road object.
+        '''
+        if obj['road_split_type'] == 'end':
+            junction_id = obj['id_direct_junction_end']
+            road_out_id_l = obj['link_successor_id_l']
+            road_out_cp_l = obj['link_successor_cp_l']
+            road_out_id_r = obj['link_successor_id_r']
+            road_out_cp_r = obj['link_successor_cp_r']
+            road_in_cp_l = 'cp_end_l'
+            road_in_cp_r = 'cp_end_r'
+        elif obj['road_split_type'] == 'start':
+            junction_id = obj['id_direct_junction_start']
+            road_out_id_l = obj['link_predecessor_id_l']
+            road_out_cp_l = obj['link_predecessor_cp_l']
+            road_out_id_r = obj['link_predecessor_id_r']
+            road_out_cp_r = obj['link_predecessor_cp_r']
+            road_in_cp_l = 'cp_start_l'
+            road_in_cp_r = 'cp_start_r'
+        dj_creator = xodr.DirectJunctionCreator(id=junction_id,
+            name='direct_junction_' + str(junction_id))
+        road_obj_in = obj
+        road_obj_out_l = self.objects_by_id.get(road_out_id_l)
+        road_obj_out_r = self.objects_by_id.get(road_out_id_r)
+        lane_ids_road_in_l, lane_ids_road_out_l = \
+            self.get_lanes_ids_to_link(road_obj_in, road_in_cp_l, road_obj_out_l, road_out_cp_l)
+        lane_ids_road_in_r, lane_ids_road_out_r = \
+            self.get_lanes_ids_to_link(road_obj_in, road_in_cp_r, road_obj_out_r, road_out_cp_r)
+        road_in = self.get_road_by_id(obj['id_odr'])
+        road_out_l = self.get_road_by_id(road_out_id_l)
+        road_out_r = self.get_road_by_id(road_out_id_r)
+        dj_creator.add_connection(road_in, road_out_l, lane_ids_road_in_l, lane_ids_road_out_l)
+        dj_creator.add_connection(road_in, road_out_r, lane_ids_road_in_r, lane_ids_road_out_r)
+        return dj_creator.junction
+
+    def create_geometry(self, params):
+        '''
+            Create an xodr plan view geometry from the geometry parameters of
+            a road or of one of its segments.
+        '''
+        if params['curve'] == 'line':
+            geometry = xodr.Line(params['length'])
+        if params['curve'] == 'arc':
+            geometry = xodr.Arc(params['curvature_start'], length=params['length'])
+        if params['curve'] == 'spiral':
+            geometry = xodr.Spiral(params['curvature_start'],
+                params['curvature_end'], length=params['length'])
+        if params['curve'] == 'parampoly3':
+            geometry = xodr.ParamPoly3(*params['coefficients_u'],
+                *params['coefficients_v'], prange='normalized',
+                length=params['length'])
+        return geometry
+
+    def create_junction_connecting_road(self, obj_jcr):
+        '''
+            Create an xodr junction connecting road linked to the incoming
+            roads.
+        '''
+        # TODO for now we use a single spiral, later we should use arc - spiral - arc
+        planview = xodr.PlanView()
+        planview.set_start_point(obj_jcr['geometry']['point_start'][0],
+            obj_jcr['geometry']['point_start'][1],obj_jcr['geometry']['heading_start'])
+        geometry = xodr.Spiral(obj_jcr['geometry']['curvature_start'],
+            obj_jcr['geometry']['curvature_end'], length=obj_jcr['geometry']['length'])
+        planview.add_geometry(geometry)
+        lanes = self.create_lanes(obj_jcr)
+        road = xodr.Road(obj_jcr['id_odr'],planview,lanes, road_type=obj_jcr['id_junction'])
+        self.add_elevation_profiles(obj_jcr, road)
+        # Connect the junction connecting road to incoming and connecting roads
+        incoming_road = self.get_road_by_id(obj_jcr['link_predecessor_id_l'])
+        contact_point = mapping_contact_point[obj_jcr['link_predecessor_cp_l']]
+        road.add_predecessor(xodr.ElementType.road, incoming_road.id, contact_point)
+        xodr.create_lane_links(road, incoming_road)
+        incoming_road = self.get_road_by_id(obj_jcr['link_successor_id_l'])
+        contact_point = mapping_contact_point[obj_jcr['link_successor_cp_l']]
+        road.add_successor(xodr.ElementType.road, incoming_road.id, contact_point)
+        xodr.create_lane_links(road, incoming_road)
+        with self.statistics.phase('adjust_startpoints'):
+            road.planview.adjust_geometries()
+        return road
+
+    def create_junction(self, obj):
+        '''
+            Create an xodr generic junction from a junction area object.
+        '''
+        incoming_roads = []
+        junction_id = obj['id_odr']
+        for joint in obj['joints']:
+            inc_road = self.get_road_by_id(joint['id_incoming'])
+            if(inc_road != None):
+                incoming_roads.append(inc_road)
+            else:
+                self.report({'WARNING'}, 'Junction with ID {}'
+                ' is missing a connection.'.format(obj['id_odr']))
+        junction_roads = []
+        for obj_jcr in self.objects_connecting_roads_by_junction_id.get(junction_id, []):
+            if 'link_predecessor_id_l' in obj_jcr and 'link_successor_id_l' in obj_jcr:
+                junction_roads.append(self.create_junction_connecting_road(obj_jcr))
+        junction = xodr.create_junction(
+            junction_roads, junction_id, incoming_roads, 'junction_' + str(junction_id))
+        print('Add junction with ID', junction_id)
+        return junction
+
+    def build_id_index(self):
+        '''
+            Build lookup tables from OpenDRIVE ID to Blender object, element
+            type and position in the collection, and from junction ID to
+            connecting road objects in a single pass over the OpenDRIVE
+            collection. The table for xodr roads is filled while the roads are
+            created. Also reset the caches for lane linking.
+        '''
+        self.objects_by_id = {}
+        self.road_ids_linked_to = {}
+        self.non_zero_lane_ids = {}
+        self.lane_ids_to_link = {}
+        self.element_types_by_id = {}
+        self.positions_by_id = {}
+        self.objects_connecting_roads_by_junction_id = {}
+        self.roads_by_id = {}
+        if not helpers.collection_exists(['OpenDRIVE']):
+            return
+        for idx, obj in enumerate(bpy.data.collections['OpenDRIVE'].objects):
+            if not 'id_odr' in obj:
+                continue
+            if obj.name.startswith('junction_connecting_road'):
+                self.objects_connecting_roads_by_junction_id.setdefault(
+                    obj['id_junction'], []).append(obj)
+            id_odr = obj['id_odr']
+            # Keep the first object in case of duplicate IDs
+            if id_odr in self.objects_by_id:
+                continue
+            self.objects_by_id[id_odr] = obj
+            self.positions_by_id[id_odr] = idx
+            if obj.name.startswith('road'):
+                self.element_types_by_id[id_odr] = xodr.ElementType.road
+                for id_linked in self.get_linked_ids(obj):
+                    self.road_ids_linked_to.setdefault(id_linked, []).append(id_odr)
+            elif obj.name.startswith('junction') or obj.name.startswith('direct_junction'):
+                self.element_types_by_id[id_odr] = xodr.ElementType.junction
+
+    def get_linked_ids(self, obj):
+        '''
+            Return the IDs of all elements an OpenDRIVE object is linked to.
+        '''
+        ids = set()
+        for key in ['link_predecessor_id_l', 'link_predecessor_id_r',
+                    'link_successor_id_l', 'link_successor_id_r']:
+            if key in obj:
+                ids.add(obj[key])
+        return ids
+
+    def find_dirty_elements(self):
+        '''
+            Find the OpenDRIVE roads and junctions which need to be rebuilt
+            because they or an element they are linked to changed since the
+            last export. Changes are detected based on a hash of the custom
+            properties of each object.
+        '''
+        self.xodr_hashes = {}
+        for id_odr, obj in self.objects_by_id.items():
+            self.xodr_hashes[id_odr] = helpers.get_custom_properties_hash(obj)
+        hashes_last = xodr_export_cache['hashes']
+        # Removed objects count as changed
+        ids_changed = set(hashes_last) - set(self.xodr_hashes)
+        for id_odr, obj_hash in self.xodr_hashes.items():
+            if not self.incremental_opendrive or hashes_last.get(id_odr) != obj_hash:
+                ids_changed.add(id_odr)
+        # Collect groups of elements which are rebuilt together and the IDs
+        # of the objects they depend on
+        dependencies = []
+        if helpers.collection_exists(['OpenDRIVE']):
+            for obj in bpy.data.collections['OpenDRIVE'].objects:
+                if obj.name.startswith('road'):
+                    keys = [('road', obj['id_odr'])]
+                    # A direct junction depends on its split road and the
+                    # roads linked to it
+                    if obj['road_split_type'] == 'start' and 'id_direct_junction_start' in obj:
+                        keys.append(('junction', obj['id_direct_junction_start']))
+                    elif obj['road_split_type'] == 'end' and 'id_direct_junction_end' in obj:
+                        keys.append(('junction', obj['id_direct_junction_end']))
+                    ids = self.get_linked_ids(obj)
+                    ids.add(obj['id_odr'])
+                    dependencies.append((keys, ids))
+                elif obj.name.startswith('junction_area'):
+                    # A generic junction and its connecting roads depend on
+                    # each other and on the incoming roads
+                    keys = [('junction', obj['id_odr'])]
+                    ids = set([obj['id_odr']])
+                    for joint in obj['joints']:
+                        ids.add(joint['id_incoming'])
+                    for obj_jcr in self.objects_connecting_roads_by_junction_id.get(obj['id_odr'], []):
+                        keys.append(('road', obj_jcr['id_odr']))
+                        ids.add(obj_jcr['id_odr'])
+                        ids |= self.get_linked_ids(obj_jcr)
+                    dependencies.append((keys, ids))
+        self.xodr_keys_dirty = set()
+        for keys, ids in dependencies:
+            if not ids.isdisjoint(ids_changed) \
+                    or any(not key in xodr_export_cache['elements'] for key in keys):
+                self.xodr_keys_dirty.update(keys)
+
     def get_element_type_by_id(self, id):
         '''
             Return element type of an OpenDRIVE element with given ID
         '''
-        for obj in bpy.data.collections['OpenDRIVE'].objects:
-            if obj.name.startswith('road'):
-                if obj['id_odr'] == id:
-                    return xodr.ElementType.road
-            elif obj.name.startswith('junction'):
-                if obj['id_odr'] == id:
-                    return xodr.ElementType.junction
-            elif obj.name.startswith('direct_junction'):
-                if obj['id_odr'] == id:
-                    return xodr.ElementType.junction
+        return self.element_types_by_id.get(id)
 
-    def get_road_by_id(self, roads, id):
+    def get_road_by_id(self, id):
         '''
-            Return road with given ID
+            Return road with given ID, create it if it does not exist yet.
         '''
-        for road in roads:
-            if road.id == id:
-                return road
-        print('WARNING: No road with ID {} found. Maybe a junction?'.format(id))
-        return None
+        road = self.roads_by_id.get(id)
+        if road is None:
+            obj = self.objects_by_id.get(id)
+            if obj is not None and obj.name.startswith('road'):
+                with self.statistics.phase('roads'):
+                    road = self.create_road(obj)
+            else:
+                print('WARNING: No road with ID {} found. Maybe a junction?'.format(id))
+        return road
 
     def get_road_mark(self, marking_type, weight, color):
         '''
@@ -623,42 +1088,64 @@ class DSC_OT_export(bpy.types.Operator):
             d=0.0
         return a, b, c, d
 
-    def link_lanes(self, roads):
-        '''
-            Create lane links for all roads.
-        '''
-        # TODO: Improve performance by exploiting symmetry, e.g., check for existing links
-        for road in roads:
-            road_obj = helpers.get_object_xodr_by_id(road.id)
-            if road.predecessor:
-                road_pre = self.get_road_by_id(roads, road.predecessor.element_id)
-                if road_pre:
-                    road_obj_pre = helpers.get_object_xodr_by_id(road.predecessor.element_id)
-                    # Check if we are connected to beginning or end of the other road
-                    if road_obj['link_predecessor_cp_l'] == 'cp_start_l':
-                        lane_ids_road, lanes_ids_road_pre = \
-                            self.get_lanes_ids_to_link(road_obj, 'cp_start_l', road_obj_pre, 'cp_start_l')
-                    elif road_obj['link_predecessor_cp_l'] == 'cp_end_l':
-                        lane_ids_road, lanes_ids_road_pre = \
-                            self.get_lanes_ids_to_link(road_obj, 'cp_start_l', road_obj_pre, 'cp_end_l')
-                    xodr.create_lane_links_from_ids(road, road_pre, lane_ids_road, lanes_ids_road_pre)
-            if road.successor:
-                road_suc = self.get_road_by_id(roads, road.successor.element_id)
-                if road_suc:
-                    road_obj_suc = helpers.get_object_xodr_by_id(road.successor.element_id)
-                    # Check if we are connected to beginning or end of the other road
-                    if road_obj['link_successor_cp_l'] == 'cp_start_l':
-                        lane_ids_road, lanes_ids_road_suc = \
-                            self.get_lanes_ids_to_link(road_obj, 'cp_end_l', road_obj_suc, 'cp_start_l')
-                    elif road_obj['link_successor_cp_l'] == 'cp_end_l':
-                        lane_ids_road, lanes_ids_road_suc = \
-                            self.get_lanes_ids_to_link(road_obj, 'cp_end_l', road_obj_suc, 'cp_end_l')
-                    xodr.create_lane_links_from_ids(road, road_suc, lane_ids_road, lanes_ids_road_suc)
+    def link_lanes(self, road):
+        '''
+            Create lane links of a road with all roads linked to it. The lane
+            IDs of each connection are matched only once, from the side of the
+            road which comes first in the collection, and applied to both
+            roads.
+        '''
+        # Collect the road level links from and to this road
+        links = []
+        roads = [road]
+        for id_linked in self.road_ids_linked_to.get(road.id, []):
+            road_linked = self.get_road_by_id(id_linked)
+            if road_linked:
+                roads.append(road_linked)
+        for road_from in roads:
+            for link_idx, link in enumerate([road_from.predecessor, road_from.successor]):
+                if not link or link.element_type != xodr.ElementType.road:
+                    continue
+                if road_from is road or link.element_id == road.id:
+                    links.append((self.positions_by_id[road_from.id], link_idx, road_from, link))
+        links.sort(key=lambda link: link[:2])
+        connections_linked = set()
+        for _, link_idx, road_from, link in links:
+            road_to = self.get_road_by_id(link.element_id)
+            if road_to is None:
+                continue
+            road_obj_from = self.objects_by_id[road_from.id]
+            road_obj_to = self.objects_by_id[link.element_id]
+            if link_idx == 0:
+                cp_type_from = 'cp_start_l'
+                cp_type_to = road_obj_from['link_predecessor_cp_l']
+            else:
+                cp_type_from = 'cp_end_l'
+                cp_type_to = road_obj_from['link_successor_cp_l']
+            if cp_type_to != 'cp_start_l' and cp_type_to != 'cp_end_l':
+                continue
+            # Both roads usually link to each other, only link once
+            connection = frozenset([(road_from.id, cp_type_from), (road_to.id, cp_type_to)])
+            if connection in connections_linked:
+                continue
+            connections_linked.add(connection)
+            lane_ids_from, lane_ids_to = \
+                self.get_lanes_ids_to_link(road_obj_from, cp_type_from, road_obj_to, cp_type_to)
+            xodr.create_lane_links_from_ids(road_from, road_to, lane_ids_from, lane_ids_to)
 
     def get_non_zero_lane_ids(self, road_obj, cp_type):
         '''
             Return the non zero width lane ids for a road's end.
         '''
+        key = (road_obj['id_odr'], cp_type)
+        if not key in self.non_zero_lane_ids:
+            self.non_zero_lane_ids[key] = self.calculate_non_zero_lane_ids(road_obj, cp_type)
+        return list(self.non_zero_lane_ids[key])
+
+    def calculate_non_zero_lane_ids(self, road_obj, cp_type):
+        '''
+            Calculate the non zero width lane ids for a road's end.
+        '''
         non_zero_lane_idxs = []
         # Go through left lanes
         for lane_idx in range(road_obj['lanes_left_num']):
@@ -740,7 +1227,19 @@ class DSC_OT_export(bpy.types.Operator):
             Pair non-split roads based on center lane. If a split road is given
             assume it is the "in" road. Split roads are either paired based on
             center lane or based on split lane index. Split to split connections
-            are currently not supported.
+            are currently not supported. The result is cached per connection.
+        '''
+        key = (road_obj_in['id_odr'], cp_type_in, road_obj_out['id_odr'], cp_type_out)
+        if not key in self.lane_ids_to_link:
+            self.lane_ids_to_link[key] = self.calculate_lanes_ids_to_link(
+                road_obj_in, cp_type_in, road_obj_out, cp_type_out)
+        ids_in, ids_out = self.lane_ids_to_link[key]
+        return [list(ids_in), list(ids_out)]
+
+    def calculate_lanes_ids_to_link(self, road_obj_in, cp_type_in, road_obj_out, cp_type_out):
+        '''
+            Calculate the lane IDs with non-zero lane width which should be
+            linked.
         '''
         non_zero_lane_ids_in = self.get_non_zero_lane_ids(road_obj_in, cp_type_in)
         non_zero_lane_ids_out = self.get_non_zero_lane_ids(road_obj_out, cp_type_out)
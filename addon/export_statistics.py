@@ -0,0 +1,121 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import time
+import tracemalloc
+
+from contextlib import contextmanager
+
+
+class DSC_export_statistics():
+    '''
+        Collect wall time, peak memory and object counts of the phases of an
+        export. Phases can be nested and entered many times. The time of a
+        phase does not include the time of phases nested into it, the peak
+        memory does. A phase nested into itself is not counted again.
+    '''
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.phases = {}
+        self.counts = {}
+        self.stack = []
+        self.time_start = None
+        self.time_last = None
+
+    def start(self):
+        self.time_start = time.perf_counter()
+        self.time_last = self.time_start
+        if self.trace_memory:
+            tracemalloc.start()
+
+    def stop(self):
+        self.update_time()
+        self.update_memory()
+        self.time_total = time.perf_counter() - self.time_start
+        if self.trace_memory:
+            tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name):
+        '''
+            Context manager measuring the enclosed code as phase with the
+            given name. Entering a phase which is already running, e.g. when
+            building a road requires building its linked roads, is counted
+            as part of the running phase.
+        '''
+        if name in self.stack:
+            yield
+            return
+        self.update_time()
+        self.update_memory()
+        if not name in self.phases:
+            self.phases[name] = {'time': 0.0, 'calls': 0, 'memory_peak': None}
+        self.phases[name]['calls'] += 1
+        self.stack.append(name)
+        try:
+            yield
+        finally:
+            self.update_time()
+            self.update_memory()
+            self.stack.pop()
+
+    def count(self, name, number=1):
+        '''
+            Increase the counter of exported objects with the given name.
+        '''
+        self.counts[name] = self.counts.get(name, 0) + number
+
+    def update_time(self):
+        '''
+            Add the time passed since the last update to the innermost phase.
+        '''
+        now = time.perf_counter()
+        if len(self.stack) > 0:
+            self.phases[self.stack[-1]]['time'] += now - self.time_last
+        self.time_last = now
+
+    def update_memory(self):
+        '''
+            Update the peak memory of all running phases with the peak since
+            the last update.
+        '''
+        if not self.trace_memory:
+            return
+        _, memory_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for name in set(self.stack):
+            phase = self.phases[name]
+            if phase['memory_peak'] is None or phase['memory_peak'] < memory_peak:
+                phase['memory_peak'] = memory_peak
+
+    def get_summary(self, num_phases=3):
+        '''
+            Return a short text with the total time and the slowest phases.
+        '''
+        phases_slowest = sorted(self.phases.items(), key=lambda item: item[1]['time'],
+            reverse=True)[:num_phases]
+        return 'Export took {:.2f} s, slowest: {}.'.format(self.time_total,
+            ', '.join('{} {:.2f} s'.format(name, phase['time']) for name, phase in phases_slowest))
+
+    def write_json(self, file_path, info):
+        '''
+            Write all statistics and the given additional info to a JSON file.
+        '''
+        statistics = dict(info)
+        statistics['time_total'] = self.time_total
+        statistics['trace_memory'] = self.trace_memory
+        statistics['phases'] = self.phases
+        statistics['counts'] = self.counts
+        with open(file_path, 'w') as file:
+            json.dump(statistics, file, indent=4)
@@ -13,6 +13,8 @@
 
 from mathutils import Vector, Matrix
 
+import numpy as np
+
 
 class DSC_geometry():
 
@@ -31,6 +33,10 @@ class DSC_geometry():
         'valid': True,
     }
 
+    # Elevation profile arrays and the elevation list they were built from
+    elevation_profile = None
+    elevation_profile_source = None
+
     def sample_cross_section(self, s, t):
         '''
             Return a list of samples x, y = f(s, t) and curvature c in local
@@ -175,42 +181,113 @@ class DSC_geometry():
         '''
         return NotImplementedError()
 
+    def sample_plan_view_batch(self, s):
+        '''
+            Return arrays x(s), y(s), curvature(s), hdg_t(s) for an array of s
+            values.
+        '''
+        raise NotImplementedError()
+
+    def get_curvature_plan_view(self, s):
+        '''
+            Return the plan view curvature for an array of s values.
+        '''
+        raise NotImplementedError()
+
+    def get_plan_view_breakpoints(self):
+        '''
+            Return an array of the s values where the plan view curvature may
+            jump between segments or has a local extremum.
+        '''
+        return np.empty(0)
+
+    def get_elevation_profile(self):
+        '''
+            Return the elevation profile as an array of the segment start
+            values s (sorted like in OpenDRIVE) and an (N, 4) array with the
+            coefficients a, b, c, d of each segment. The arrays are only
+            rebuilt when the elevation profile changes.
+        '''
+        elevation = self.params['elevation']
+        if self.elevation_profile_source is not elevation:
+            s_start = np.array([segment['s'] for segment in elevation], dtype=np.float64)
+            coefficients = np.array([[segment['a'], segment['b'], segment['c'], segment['d']]
+                for segment in elevation], dtype=np.float64)
+            self.elevation_profile = (s_start, coefficients)
+            self.elevation_profile_source = elevation
+        return self.elevation_profile
+
+    def get_elevation_segment_index(self, s):
+        '''
+            Return the index of the elevation segment for each s value.
+            Values before the first segment belong to the first segment.
+        '''
+        s_start, _ = self.get_elevation_profile()
+        idx_segment = np.searchsorted(s_start, s, side='right') - 1
+        return np.maximum(idx_segment, 0)
+
     def get_elevation(self, s):
         '''
             Return the elevation coefficients for the given value of s.
         '''
-        idx_elevation = 0
-        while idx_elevation < len(self.params['elevation'])-1:
-            if s >= self.params['elevation'][idx_elevation+1]['s']:
-                idx_elevation += 1
-            else:
-                break
-        return self.params['elevation'][idx_elevation]
+        return self.params['elevation'][int(self.get_elevation_segment_index(s))]
+
+    def get_elevation_coefficients_batch(self, s):
+        '''
+            Return arrays of the elevation coefficients a, b, c, d for an
+            array of s values.
+        '''
+        _, coefficients = self.get_elevation_profile()
+        return np.moveaxis(coefficients[self.get_elevation_segment_index(s)], -1, 0)
+
+    def sample_elevation_batch(self, s):
+        '''
+            Return arrays of the height, the slope and the second derivative
+            of the elevation for an array of s values. The polynomials are
+            evaluated with Horner's scheme.
+        '''
+        s = np.asarray(s, dtype=np.float64)
+        a, b, c, d = self.get_elevation_coefficients_batch(s)
+        height = a + s * (b + s * (c + s * d))
+        slope = b + s * (2 * c + s * 3 * d)
+        slope_derivative = 2 * c + s * 6 * d
+        return height, slope, slope_derivative
+
+    def get_curvature_elevation_batch(self, s):
+        '''
+            Return the curvature of the elevation function for an array of s
+            values.
+        '''
+        _, de_ds, d2e_d2s = self.sample_elevation_batch(s)
+        return d2e_d2s / (1 + de_ds**2)**(3/2)
 
     def sample_cross_section(self, s, t_vec):
         '''
             Sample a cross section (multiple t values) in the local coordinate
             system.
         '''
-        x_s, y_s, curvature_plan_view, hdg_t = self.sample_plan_view(s)
-        elevation = self.get_elevation(s)
-        # Calculate curvature of the elevation function
-        d2e_d2s = 2 * elevation['c'] + 3 * elevation['d'] * s
-        if d2e_d2s != 0:
-            de_ds = elevation['b']+ 2 * elevation['c'] * s + 3 * elevation['d'] * s
-            curvature_elevation = (1 + de_ds**2)**(3/2) / d2e_d2s
-        else:
-            curvature_elevation = 0
+        xyz, curvature_abs = self.sample_cross_section_batch([s], t_vec)
+        return [tuple(xyz_t) for xyz_t in xyz[0].tolist()], float(curvature_abs[0])
+
+    def sample_cross_section_batch(self, s, t):
+        '''
+            Sample N cross sections in the local coordinate system. Takes an
+            array of N s values and either one array of M t values for all
+            cross sections or an N x M array. Return an (N, M, 3) array with
+            the x, y, z coordinates and an array with the absolute curvature
+            for each s value.
+        '''
+        s = np.asarray(s, dtype=np.float64)
+        t = np.asarray(t, dtype=np.float64)
+        if t.ndim == 1:
+            t = np.broadcast_to(t, (s.size, t.size))
+        x_s, y_s, curvature_plan_view, hdg_t = self.sample_plan_view_batch(s)
+        height, de_ds, d2e_d2s = self.sample_elevation_batch(s)
+        xyz = np.empty((s.size, t.shape[1], 3), dtype=np.float64)
+        xyz[:, :, 0] = x_s[:, np.newaxis] + t * np.cos(hdg_t)[:, np.newaxis]
+        xyz[:, :, 1] = y_s[:, np.newaxis] + t * np.sin(hdg_t)[:, np.newaxis]
+        xyz[:, :, 2] = height[:, np.newaxis]
         # FIXME convert curvature for t unequal 0
-        curvature_abs = max(abs(curvature_plan_view), abs(curvature_elevation))
-        vector_hdg_t = Vector((1.0, 0.0))
-        vector_hdg_t.rotate(Matrix.Rotation(hdg_t, 2))
-        xyz = []
-        for t in t_vec:
-            xy_vec = Vector((x_s, y_s)) + t * vector_hdg_t
-            z = elevation['a'] + \
-                elevation['b'] * s + \
-                elevation['c'] * s**2 + \
-                elevation['d'] * s**3
-            xyz += [(xy_vec.x, xy_vec.y, z)]
-        return xyz, curvature_abs
\ No newline at end of file
+        curvature_elevation = d2e_d2s / (1 + de_ds**2)**(3/2)
+        curvature_abs = np.maximum(np.abs(curvature_plan_view), np.abs(curvature_elevation))
+        return xyz, curvature_abs
@@ -16,6 +16,8 @@ from . geometry import DSC_geometry
 from mathutils import Vector, Matrix
 from math import cos, inf, sin, pi, degrees
 
+import numpy as np
+
 
 class Arc():
 
@@ -129,4 +131,27 @@ class DSC_geometry_arc(DSC_geometry):
                         * self.geometry_base.radius + self.geometry_base.offset_y
                 hdg_t = -angle_s + pi/2
         curvature = self.geometry_base.curvature
-        return x_s, y_s, curvature, hdg_t
\ No newline at end of file
+        return x_s, y_s, curvature, hdg_t
+
+    def sample_plan_view_batch(self, s):
+        s = np.asarray(s, dtype=np.float64)
+        if self.geometry_base.radius == inf:
+            # Circle degenerates into a straight line
+            x_s = s.copy()
+            y_s = np.zeros(s.shape)
+            hdg_t = np.full(s.shape, pi/2)
+        else:
+            # We have a circle
+            angle_s = s / self.geometry_base.radius
+            if self.geometry_base.determinant <= 0:
+                angle_s = -angle_s
+            x_s = np.cos(angle_s + self.geometry_base.offset_angle - pi/2) \
+                    * self.geometry_base.radius
+            y_s = np.sin(angle_s + self.geometry_base.offset_angle - pi/2) \
+                    * self.geometry_base.radius + self.geometry_base.offset_y
+            hdg_t = angle_s + pi/2
+        curvature = self.get_curvature_plan_view(s)
+        return x_s, y_s, curvature, hdg_t
+
+    def get_curvature_plan_view(self, s):
+        return np.full(np.shape(s), self.geometry_base.curvature, dtype=np.float64)
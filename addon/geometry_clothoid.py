@@ -16,55 +16,128 @@ from . geometry import DSC_geometry
 from mathutils import Vector
 from pyclothoids import Clothoid
 from math import pi
+from functools import lru_cache
+
+import numpy as np
+from numpy.polynomial.legendre import leggauss
+
+
+class Spiral():
+    '''
+        Vectorized evaluation of a clothoid segment with linear curvature
+        kappa(s) = curvature_start + curvature_rate * s. The Fresnel
+        integrals for x and y are evaluated by Gauss-Legendre quadrature.
+        The segment is split into pieces with a heading change of at most
+        max_angle_piece, over which the quadrature is exact to machine
+        precision. Positions at the piece starts are accumulated once, each
+        sample then only integrates from the start of its piece.
+    '''
+
+    num_nodes = 8
+    max_angle_piece = 1.0
+    nodes, weights = leggauss(num_nodes)
+    # Map nodes and weights from [-1, 1] to [0, 1]
+    nodes = 0.5 * (nodes + 1.0)
+    weights = 0.5 * weights
+
+    def __init__(self, curvature_start, curvature_rate, length,
+                 x_start=0.0, y_start=0.0, heading_start=0.0):
+        self.curvature_start = curvature_start
+        self.curvature_rate = curvature_rate
+        self.length = length
+        self.heading_start = heading_start
+        curvature_max = max(abs(curvature_start), abs(curvature_start + curvature_rate * length))
+        self.num_pieces = max(1, int(np.ceil(curvature_max * length / self.max_angle_piece)))
+        self.length_piece = length / self.num_pieces
+        s_piece_start = np.arange(self.num_pieces) * self.length_piece
+        dx, dy = self.integrate(s_piece_start, np.full(self.num_pieces, self.length_piece))
+        self.x_piece_start = x_start + np.concatenate(([0.0], np.cumsum(dx)))
+        self.y_piece_start = y_start + np.concatenate(([0.0], np.cumsum(dy)))
+
+    def get_heading(self, s):
+        return self.heading_start + s * (self.curvature_start + 0.5 * self.curvature_rate * s)
+
+    def get_curvature(self, s):
+        return self.curvature_start + self.curvature_rate * s
+
+    def integrate(self, s_start, length):
+        '''
+            Return the x and y increments along the spiral from each start
+            value over the corresponding length.
+        '''
+        s_nodes = s_start[:, np.newaxis] + length[:, np.newaxis] * self.nodes
+        heading_nodes = self.get_heading(s_nodes)
+        dx = length * (np.cos(heading_nodes) @ self.weights)
+        dy = length * (np.sin(heading_nodes) @ self.weights)
+        return dx, dy
+
+    def evaluate(self, s):
+        '''
+            Return x, y, heading and curvature for an array of s values.
+        '''
+        s = np.asarray(s, dtype=np.float64)
+        if self.length_piece > 0:
+            idx_piece = np.clip(np.floor(s / self.length_piece).astype(np.int64), 0, self.num_pieces - 1)
+        else:
+            idx_piece = np.zeros(s.shape, dtype=np.int64)
+        s_piece = idx_piece * self.length_piece
+        dx, dy = self.integrate(s_piece.ravel(), (s - s_piece).ravel())
+        x = self.x_piece_start[idx_piece] + dx.reshape(s.shape)
+        y = self.y_piece_start[idx_piece] + dy.reshape(s.shape)
+        return x, y, self.get_heading(s), self.get_curvature(s)
+
+
+@lru_cache(maxsize=1024)
+def solve_clothoid(geometry_solver, x_end, y_end, heading_end, curvature_start):
+    '''
+        Return the clothoid starting in the origin with heading 0 and its
+        vectorized evaluation. The results are cached, so the inputs should
+        be quantized. Cached clothoids must not be modified.
+    '''
+    if geometry_solver == 'forward':
+        clothoid = Clothoid.Forward(0.0, 0.0, 0.0, curvature_start, x_end, y_end)
+    else:
+        clothoid = Clothoid.G1Hermite(0.0, 0.0, 0.0, x_end, y_end, heading_end)
+    return clothoid, Spiral(clothoid.KappaStart, clothoid.dk, clothoid.length)
 
 
 class DSC_geometry_clothoid(DSC_geometry):
 
+    # Last valid solution, a zero length straight spiral until the first
+    # valid solution is found
+    geometry_base = None
+    spiral = Spiral(0.0, 0.0, 0.0)
+
+    # Quantization of the solver inputs in m, rad and 1/m
+    quantization_point = 1e-6
+    quantization_heading = 1e-9
+    quantization_curvature = 1e-9
+
     def update_plan_view(self, params, geometry_solver='default'):
         # Calculate transform between global and local coordinates
         self.update_local_to_global(params['point_start'], params['heading_start'],
             params['point_end'], params['heading_end'])
 
         # Calculate geometry
-        if geometry_solver == 'hermite' or geometry_solver == 'default':
-            self.geometry_base = Clothoid.G1Hermite(0.0, 0.0, 0.0,
-                self.point_end_local.x, self.point_end_local.y, self.heading_end_local)
-
-            # When the heading of start and end point is colinear the curvature
-            # can become very small and the length becomes huge (solution is a gigantic
-            # circle). Therefore as a workaround we limit the length to 10 km.
-            if self.geometry_base.length < 10000.0:
-                self.params['valid'] = True
-            else:
-                # Use old parameters
-                self.update_local_to_global(self.params['point_start'], self.params['heading_start'],
-                    self.params['point_end'], self.params['heading_end'])
-                self.geometry_base = Clothoid.G1Hermite(0.0, 0.0, 0.0,
-                    self.point_end_local.x, self.point_end_local.y, self.heading_end_local)
-                self.params['valid'] = False
-        elif geometry_solver == 'forward':
-            if self.point_end_local == Vector((0.0, 0.0, 0.0)):
-                # Handle edge case where points are identical
-                self.geometry_base.length = 0.0
-                self.geometry_base.KappaStart = 0.0
-                self.geometry_base.KappaEnd = 0.0
-                self.geometry_base.ThetaEnd = 0.0
-                self.params['valid'] = False
-            else:
-                self.geometry_base = Clothoid.Forward(0.0, 0.0, 0.0,
-                    params['curvature_start'], self.point_end_local.x, self.point_end_local.y)
-                ## When the heading of start and end point is colinear the curvature
-                # can become very small and the length becomes huge (solution is a gigantic
-                # circle). Therefore as a workaround we limit the length to 10 km.
-                if self.geometry_base.length < 10000.0:
-                    self.params['valid'] = True
-                else:
-                    self.params['valid'] = False
-                    # Use old parameters
-                    self.update_local_to_global(self.params['point_start'], self.params['heading_start'],
-                        self.params['point_end'], self.params['heading_end'])
-                    self.geometry_base = Clothoid.Forward(0.0, 0.0, 0.0,
-                        self.params['curvature_start'], self.point_end_local.x, self.point_end_local.y)
+        if geometry_solver == 'forward' and self.point_end_local == Vector((0.0, 0.0, 0.0)):
+            # Handle edge case where points are identical
+            geometry_base = None
+        else:
+            geometry_base, spiral = self.solve(geometry_solver, params['curvature_start'])
+
+        # When the heading of start and end point is colinear the curvature
+        # can become very small and the length becomes huge (solution is a gigantic
+        # circle). Therefore as a workaround we limit the length to 10 km.
+        if geometry_base is not None and geometry_base.length < 10000.0:
+            self.geometry_base = geometry_base
+            # Vectorized evaluation of the clothoid for sampling
+            self.spiral = spiral
+            self.params['valid'] = True
+        else:
+            # Use old parameters and keep the last valid solution
+            self.update_local_to_global(self.params['point_start'], self.params['heading_start'],
+                self.params['point_end'], self.params['heading_end'])
+            self.params['valid'] = False
 
         # Remember geometry parameters
         if self.params['valid']:
@@ -78,9 +151,32 @@ class DSC_geometry_clothoid(DSC_geometry):
             self.params['curvature_end'] = self.geometry_base.KappaEnd
             self.params['angle_end'] = self.geometry_base.ThetaEnd
 
+    def solve(self, geometry_solver, curvature_start):
+        '''
+            Return the clothoid for the current local end point and heading
+            from the solver cache. Only the inputs used by the solver are
+            part of the cache key.
+        '''
+        x_end = round(self.point_end_local.x / self.quantization_point) * self.quantization_point
+        y_end = round(self.point_end_local.y / self.quantization_point) * self.quantization_point
+        if geometry_solver == 'forward':
+            heading_end = 0.0
+            curvature_start = round(curvature_start / self.quantization_curvature) \
+                * self.quantization_curvature
+        else:
+            geometry_solver = 'hermite'
+            heading_end = round(self.heading_end_local / self.quantization_heading) \
+                * self.quantization_heading
+            curvature_start = 0.0
+        return solve_clothoid(geometry_solver, x_end, y_end, heading_end, curvature_start)
+
     def sample_plan_view(self, s):
-        x_s = self.geometry_base.X(s)
-        y_s = self.geometry_base.Y(s)
-        curvature = self.geometry_base.KappaStart + self.geometry_base.dk * s
-        hdg_t = self.geometry_base.Theta(s) + pi/2
-        return x_s, y_s, curvature, hdg_t
+        x_s, y_s, hdg, curvature = self.spiral.evaluate(s)
+        return float(x_s), float(y_s), float(curvature), float(hdg) + pi/2
+
+    def sample_plan_view_batch(self, s):
+        x_s, y_s, hdg, curvature = self.spiral.evaluate(s)
+        return x_s, y_s, curvature, hdg + pi/2
+
+    def get_curvature_plan_view(self, s):
+        return self.spiral.get_curvature(np.asarray(s, dtype=np.float64))
@@ -12,20 +12,24 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 from . geometry import DSC_geometry
-from . import helpers
 
 from mathutils import Vector, Matrix
 from mathutils.geometry import distance_point_to_plane
 from math import pi
 
+import numpy as np
+
 
 class DSC_geometry_line(DSC_geometry):
 
     def update_plan_view(self, params, geometry_solver):
         if params['connected_start']:
             heading_start_line = params['heading_start']
-            point_end = helpers.project_point_vector(params['point_start'].to_2d(),
-                heading_start_line, params['point_end'].to_2d())
+            # Project end point to the start heading
+            vector_hdg_2d = Vector((1.0, 0.0))
+            vector_hdg_2d.rotate(Matrix.Rotation(heading_start_line, 2))
+            point_end = params['point_start'].to_2d() + (params['point_end'].to_2d() \
+                - params['point_start'].to_2d()).project(vector_hdg_2d)
             # Add height back to end point
             point_end = point_end.to_3d()
             point_end.z = params['point_end'].z
@@ -69,4 +73,14 @@ class DSC_geometry_line(DSC_geometry):
         y_s = 0
         curvature = 0
         hdg_t = pi/2
-        return x_s, y_s, curvature, hdg_t
\ No newline at end of file
+        return x_s, y_s, curvature, hdg_t
+
+    def sample_plan_view_batch(self, s):
+        x_s = np.array(s, dtype=np.float64)
+        y_s = np.zeros(x_s.shape)
+        curvature = self.get_curvature_plan_view(x_s)
+        hdg_t = np.full(x_s.shape, pi/2)
+        return x_s, y_s, curvature, hdg_t
+
+    def get_curvature_plan_view(self, s):
+        return np.zeros(np.shape(s))
@@ -0,0 +1,258 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+from . geometry import DSC_geometry
+
+from mathutils import Vector
+from math import cos, sin, pi
+
+import numpy as np
+from numpy.polynomial.legendre import leggauss
+
+
+class ParamPoly3():
+    '''
+        Cubic parametric polynomial u(p), v(p) with normalized parameter p in
+        [0, 1]. Since p is not the arc length, a lookup table of the arc
+        length at equidistant values of p is integrated once with
+        Gauss-Legendre quadrature. Sampling by s then only needs a binary
+        search in the table, a cubic Hermite interpolation of p(s) and one
+        Newton step for refinement.
+    '''
+
+    num_intervals = 256
+    num_nodes = 8
+    nodes, weights = leggauss(num_nodes)
+    # Map nodes and weights from [-1, 1] to [0, 1]
+    nodes = 0.5 * (nodes + 1.0)
+    weights = 0.5 * weights
+
+    def __init__(self, coefficients_u, coefficients_v):
+        self.coefficients_u = np.array(coefficients_u, dtype=np.float64)
+        self.coefficients_v = np.array(coefficients_v, dtype=np.float64)
+        self.p_table = np.linspace(0.0, 1.0, self.num_intervals + 1)
+        ds = self.integrate_speed(self.p_table[:-1], np.diff(self.p_table))
+        self.s_table = np.concatenate(([0.0], np.cumsum(ds)))
+        self.speed_table = self.get_speed(self.p_table)
+        self.length = self.s_table[-1]
+
+    def get_derivatives(self, p):
+        '''
+            Return first and second derivatives of u and v with respect to p.
+        '''
+        _, b_u, c_u, d_u = self.coefficients_u
+        _, b_v, c_v, d_v = self.coefficients_v
+        du_dp = b_u + p * (2 * c_u + p * 3 * d_u)
+        dv_dp = b_v + p * (2 * c_v + p * 3 * d_v)
+        d2u_dp2 = 2 * c_u + p * 6 * d_u
+        d2v_dp2 = 2 * c_v + p * 6 * d_v
+        return du_dp, dv_dp, d2u_dp2, d2v_dp2
+
+    def get_speed(self, p):
+        '''
+            Return the derivative of the arc length with respect to p.
+        '''
+        du_dp, dv_dp, _, _ = self.get_derivatives(p)
+        return np.hypot(du_dp, dv_dp)
+
+    def integrate_speed(self, p_start, length_p):
+        '''
+            Return the arc length from each start value of p over the
+            corresponding length in p.
+        '''
+        p_nodes = p_start[..., np.newaxis] + length_p[..., np.newaxis] * self.nodes
+        return length_p * (self.get_speed(p_nodes) @ self.weights)
+
+    def get_p(self, s):
+        '''
+            Return the parameter p for an array of arc length values s.
+        '''
+        s = np.clip(np.asarray(s, dtype=np.float64), 0.0, self.length)
+        idx = np.clip(np.searchsorted(self.s_table, s, side='right') - 1, 0, self.num_intervals - 1)
+        s_0 = self.s_table[idx]
+        length_s = self.s_table[idx + 1] - s_0
+        length_p = self.p_table[idx + 1] - self.p_table[idx]
+        # Cubic Hermite interpolation of p(s) with slopes dp/ds = 1 / speed
+        # in the normalized interval parameter x
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = np.where(length_s > 0, (s - s_0) / length_s, 0.0)
+            slope_0 = np.minimum(length_s / self.speed_table[idx], 3 * length_p)
+            slope_1 = np.minimum(length_s / self.speed_table[idx + 1], 3 * length_p)
+        p = self.p_table[idx] + length_p * (3 - 2 * x) * x**2 \
+            + x * (1 - x)**2 * slope_0 - x**2 * (1 - x) * slope_1
+        p = np.clip(p, self.p_table[idx], self.p_table[idx + 1])
+        # Newton step on the arc length from the start of the interval
+        speed = self.get_speed(p)
+        error_s = s_0 + self.integrate_speed(self.p_table[idx], p - self.p_table[idx]) - s
+        p = np.where(speed > 0, p - error_s / np.where(speed > 0, speed, 1.0), p)
+        return np.clip(p, self.p_table[idx], self.p_table[idx + 1])
+
+    def get_curvature(self, p):
+        '''
+            Return the curvature for an array of p values.
+        '''
+        du_dp, dv_dp, d2u_dp2, d2v_dp2 = self.get_derivatives(p)
+        speed = np.hypot(du_dp, dv_dp)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(speed > 0, (du_dp * d2v_dp2 - dv_dp * d2u_dp2) / speed**3, 0.0)
+
+    def get_s(self, p):
+        '''
+            Return the arc length for an array of p values.
+        '''
+        p = np.clip(np.asarray(p, dtype=np.float64), 0.0, 1.0)
+        idx = np.clip(np.searchsorted(self.p_table, p, side='right') - 1, 0, self.num_intervals - 1)
+        return self.s_table[idx] + self.integrate_speed(self.p_table[idx], p - self.p_table[idx])
+
+    def get_p_curvature_extrema(self, num_iterations=20):
+        '''
+            Return the p values of the local extrema of the curvature.
+            Extrema are bracketed on the table of p values and refined with a
+            golden section search.
+        '''
+        curvature_diff = np.diff(self.get_curvature(self.p_table))
+        idx = np.flatnonzero(curvature_diff[:-1] * curvature_diff[1:] < 0) + 1
+        if idx.size == 0:
+            return np.empty(0)
+        # Search the maximum of the curvature or of its negative
+        sign = np.sign(curvature_diff[idx - 1])
+        p_low = self.p_table[idx - 1]
+        p_high = self.p_table[idx + 1]
+        ratio = (np.sqrt(5) - 1) / 2
+        for _ in range(num_iterations):
+            p_left = p_high - ratio * (p_high - p_low)
+            p_right = p_low + ratio * (p_high - p_low)
+            curvature_left, curvature_right = sign * self.get_curvature(np.stack((p_left, p_right)))
+            left_larger = curvature_left > curvature_right
+            p_high = np.where(left_larger, p_right, p_high)
+            p_low = np.where(left_larger, p_low, p_left)
+        return 0.5 * (p_low + p_high)
+
+    def get_s_curvature_extrema(self):
+        '''
+            Return the arc length values of the local extrema of the
+            curvature.
+        '''
+        return self.get_s(self.get_p_curvature_extrema())
+
+    def get_curvature_abs_max(self):
+        '''
+            Return the largest absolute curvature.
+        '''
+        p = np.concatenate((self.p_table, self.get_p_curvature_extrema()))
+        return float(np.max(np.abs(self.get_curvature(p))))
+
+    def get_heading_change(self):
+        '''
+            Return the total absolute change of the heading along the curve.
+        '''
+        du_dp, dv_dp, _, _ = self.get_derivatives(self.p_table)
+        return float(np.sum(np.abs(np.diff(np.unwrap(np.arctan2(dv_dp, du_dp))))))
+
+    def evaluate(self, s):
+        '''
+            Return u, v, heading and curvature for an array of s values.
+        '''
+        p = self.get_p(s)
+        a_u, b_u, c_u, d_u = self.coefficients_u
+        a_v, b_v, c_v, d_v = self.coefficients_v
+        u = a_u + p * (b_u + p * (c_u + p * d_u))
+        v = a_v + p * (b_v + p * (c_v + p * d_v))
+        du_dp, dv_dp, _, _ = self.get_derivatives(p)
+        heading = np.arctan2(dv_dp, du_dp)
+        return u, v, heading, self.get_curvature(p)
+
+
+class DSC_geometry_parametric_polynomial(DSC_geometry):
+
+    # Last valid solution, a straight line until the first valid solution is
+    # found (the road length stays 0 until then)
+    geometry_base = ParamPoly3([0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 0.0, 0.0])
+
+    # Curves which (almost) stop at a cusp, loop or turn on the spot are not
+    # valid roads. Limits for the smallest speed |d(u, v)/dp| relative to the
+    # distance of start and end point, the smallest radius in m and the total
+    # heading change in rad.
+    speed_min_relative = 0.1
+    radius_min = 0.5
+    heading_change_max = 1.5 * pi
+
+    def __init__(self):
+        # Keep the polynomial coefficients out of the parameters shared by
+        # the other geometries
+        self.params = dict(DSC_geometry.params)
+
+    def update_plan_view(self, params, geometry_solver='default'):
+        # Calculate transform between global and local coordinates
+        self.update_local_to_global(params['point_start'], params['heading_start'],
+            params['point_end'], params['heading_end'])
+
+        # Calculate geometry as cubic Hermite curve from the start point with
+        # heading 0 to the local end point with the local end heading. The
+        # tangents are scaled with the distance between start and end point.
+        point_end = self.point_end_local.to_2d()
+        length_tangent = point_end.length
+        tangent_start = Vector((length_tangent, 0.0))
+        tangent_end = length_tangent * Vector((cos(self.heading_end_local),
+            sin(self.heading_end_local)))
+        coefficients_c = 3 * point_end - 2 * tangent_start - tangent_end
+        coefficients_d = -2 * point_end + tangent_start + tangent_end
+        coefficients_u = [0.0, tangent_start.x, coefficients_c.x, coefficients_d.x]
+        coefficients_v = [0.0, tangent_start.y, coefficients_c.y, coefficients_d.y]
+        geometry_base = ParamPoly3(coefficients_u, coefficients_v)
+
+        # Limit length to 10 km like for the other geometries
+        valid = 0.0 < geometry_base.length < 10000.0 \
+            and np.min(geometry_base.speed_table) >= self.speed_min_relative * length_tangent \
+            and geometry_base.get_heading_change() <= self.heading_change_max \
+            and geometry_base.get_curvature_abs_max() * self.radius_min <= 1.0
+        if valid:
+            self.geometry_base = geometry_base
+            self.params['valid'] = True
+        else:
+            # Use old parameters and keep the last valid solution
+            self.update_local_to_global(self.params['point_start'], self.params['heading_start'],
+                self.params['point_end'], self.params['heading_end'])
+            self.params['valid'] = False
+
+        # Remember geometry parameters
+        if self.params['valid']:
+            _, _, heading_ends, curvature_ends = \
+                self.geometry_base.evaluate([0.0, self.geometry_base.length])
+            self.params['curve'] = 'parampoly3'
+            self.params['point_start'] = params['point_start']
+            self.params['heading_start'] = params['heading_start']
+            self.params['point_end'] = params['point_end']
+            self.params['heading_end'] = params['heading_start'] + float(heading_ends[1])
+            self.params['curvature_start'] = float(curvature_ends[0])
+            self.params['curvature_end'] = float(curvature_ends[1])
+            self.params['length'] = self.geometry_base.length
+            self.params['coefficients_u'] = coefficients_u
+            self.params['coefficients_v'] = coefficients_v
+
+    def sample_plan_view(self, s):
+        x_s, y_s, hdg, curvature = self.geometry_base.evaluate(s)
+        return float(x_s), float(y_s), float(curvature), float(hdg) + pi/2
+
+    def sample_plan_view_batch(self, s):
+        x_s, y_s, hdg, curvature = self.geometry_base.evaluate(s)
+        return x_s, y_s, curvature, hdg + pi/2
+
+    def get_curvature_plan_view(self, s):
+        _, _, _, curvature = self.geometry_base.evaluate(s)
+        return curvature
+
+    def get_plan_view_breakpoints(self):
+        # The curvature is not linear in s, between its extrema it is monotonic
+        return self.geometry_base.get_s_curvature_extrema()
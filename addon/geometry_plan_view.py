@@ -0,0 +1,229 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+from . geometry import DSC_geometry
+from . geometry_clothoid import Spiral
+
+from mathutils import Vector, Matrix
+from math import ceil, pi
+
+import numpy as np
+
+
+class PlanView():
+    '''
+        Vectorized evaluation of a chain of line, arc and spiral segments,
+        each with linear curvature. Like for the Spiral, the segments are
+        split into pieces with a heading change of at most max_angle_piece.
+        The pieces of all segments form one table sorted by their start
+        value s, samples find their piece by binary search and only
+        integrate from the start of the piece.
+    '''
+
+    max_angle_piece = Spiral.max_angle_piece
+    nodes = Spiral.nodes
+    weights = Spiral.weights
+
+    def __init__(self, segments, x_start=0.0, y_start=0.0, heading_start=0.0):
+        s_piece = []
+        heading_piece = []
+        curvature_piece = []
+        curvature_rate_piece = []
+        s_segment = 0.0
+        heading_segment = heading_start
+        for segment in segments:
+            length = segment['length']
+            curvature_start = segment['curvature_start']
+            if length > 0:
+                curvature_rate = (segment['curvature_end'] - curvature_start) / length
+            else:
+                curvature_rate = 0.0
+            curvature_max = max(abs(curvature_start), abs(segment['curvature_end']))
+            num_pieces = max(1, ceil(curvature_max * length / self.max_angle_piece))
+            s_local = np.arange(num_pieces) * length / num_pieces
+            s_piece.append(s_segment + s_local)
+            heading_piece.append(heading_segment + s_local * (curvature_start + 0.5 * curvature_rate * s_local))
+            curvature_piece.append(curvature_start + curvature_rate * s_local)
+            curvature_rate_piece.append(np.full(num_pieces, curvature_rate))
+            s_segment += length
+            heading_segment += length * (curvature_start + 0.5 * curvature_rate * length)
+        self.length = s_segment
+        self.s_piece = np.concatenate(s_piece)
+        self.heading_piece = np.concatenate(heading_piece)
+        self.curvature_piece = np.concatenate(curvature_piece)
+        self.curvature_rate_piece = np.concatenate(curvature_rate_piece)
+        self.num_pieces = self.s_piece.size
+        length_piece = np.diff(np.append(self.s_piece, self.length))
+        dx, dy = self.integrate(np.arange(self.num_pieces), length_piece)
+        self.x_piece = x_start + np.concatenate(([0.0], np.cumsum(dx)[:-1]))
+        self.y_piece = y_start + np.concatenate(([0.0], np.cumsum(dy)[:-1]))
+
+    def get_piece_index(self, s):
+        '''
+            Return the index of the piece for each s value.
+        '''
+        idx_piece = np.searchsorted(self.s_piece, s, side='right') - 1
+        return np.clip(idx_piece, 0, self.num_pieces - 1)
+
+    def get_heading(self, idx_piece, ds):
+        return self.heading_piece[idx_piece] + ds * (self.curvature_piece[idx_piece]
+            + 0.5 * self.curvature_rate_piece[idx_piece] * ds)
+
+    def integrate(self, idx_piece, length):
+        '''
+            Return the x and y increments from the start of each piece over
+            the corresponding length.
+        '''
+        ds_nodes = length[:, np.newaxis] * self.nodes
+        heading_nodes = self.get_heading(idx_piece[:, np.newaxis], ds_nodes)
+        dx = length * (np.cos(heading_nodes) @ self.weights)
+        dy = length * (np.sin(heading_nodes) @ self.weights)
+        return dx, dy
+
+    def evaluate(self, s):
+        '''
+            Return x, y, heading and curvature for an array of s values.
+        '''
+        s = np.asarray(s, dtype=np.float64)
+        idx_piece = self.get_piece_index(s)
+        ds = s - self.s_piece[idx_piece]
+        dx, dy = self.integrate(idx_piece.ravel(), ds.ravel())
+        x = self.x_piece[idx_piece] + dx.reshape(s.shape)
+        y = self.y_piece[idx_piece] + dy.reshape(s.shape)
+        heading = self.get_heading(idx_piece, ds)
+        curvature = self.curvature_piece[idx_piece] + self.curvature_rate_piece[idx_piece] * ds
+        return x, y, heading, curvature
+
+
+class DSC_geometry_plan_view(DSC_geometry):
+    '''
+        Geometry made of a chain of line, arc and spiral segments. The last
+        segment is solved by the segment geometry from the end of the chain
+        to the selected end point, append_segment fixes it and the next
+        segment continues from its end. Without fixed segments this geometry
+        behaves exactly like the segment geometry.
+    '''
+
+    def __init__(self, geometry_segment):
+        self.geometry_segment = geometry_segment
+        # The segment geometry writes to the shared parameters of DSC_geometry
+        self.params = dict(DSC_geometry.params)
+        self.segments = []
+
+    def clear_segments(self):
+        '''
+            Remove all fixed segments.
+        '''
+        self.segments = []
+
+    def append_segment(self):
+        '''
+            Fix the current last segment, the next segment starts at its end.
+        '''
+        if len(self.segments) == 0:
+            self.point_start_chain = self.params['point_start'].copy()
+            self.heading_start_chain = self.params['heading_start']
+        self.segments.append(self.get_segment(self.geometry_segment.params,
+            self.params['length'] - self.geometry_segment.params['length']))
+        self.update_chain_end()
+
+    def remove_segment(self):
+        '''
+            Remove the last fixed segment, the next segment starts at the end
+            of the remaining chain.
+        '''
+        self.segments.pop()
+        if len(self.segments) > 0:
+            self.update_chain_end()
+
+    def update_chain_end(self):
+        '''
+            Calculate end point, heading and curvature of the fixed segments
+            where the next segment starts.
+        '''
+        plan_view = PlanView(self.segments)
+        x, y, heading, curvature = plan_view.evaluate(plan_view.length)
+        self.point_end_chain = self.point_start_chain \
+            + Matrix.Rotation(self.heading_start_chain, 3, 'Z') @ Vector((float(x), float(y), 0.0))
+        self.heading_end_chain = self.heading_start_chain + float(heading)
+        self.curvature_end_chain = float(curvature)
+
+    def get_segment(self, params, s):
+        '''
+            Return the parameters of a segment starting at s.
+        '''
+        return {'curve': params['curve'], 's': s, 'length': params['length'],
+                'curvature_start': params['curvature_start'],
+                'curvature_end': params['curvature_end']}
+
+    def update_plan_view(self, params, geometry_solver='default'):
+        if len(self.segments) == 0:
+            self.geometry_segment.update_plan_view(params, geometry_solver)
+            self.params.update(self.geometry_segment.params)
+            self.params.pop('segments', None)
+            self.matrix_world = self.geometry_segment.matrix_world
+            self.point_end_local = self.geometry_segment.point_end_local
+            self.heading_end_local = self.geometry_segment.heading_end_local
+            return
+
+        # Solve the last segment from the end of the chain
+        params_segment = dict(params)
+        params_segment['point_start'] = self.point_end_chain
+        params_segment['heading_start'] = self.heading_end_chain
+        params_segment['curvature_start'] = self.curvature_end_chain
+        params_segment['connected_start'] = True
+        self.geometry_segment.update_plan_view(params_segment, geometry_solver)
+        params_segment = self.geometry_segment.params
+        s_segment = self.segments[-1]['s'] + self.segments[-1]['length']
+        segments = self.segments + [self.get_segment(params_segment, s_segment)]
+
+        # Calculate transform between global and local coordinates
+        self.update_local_to_global(self.point_start_chain, self.heading_start_chain,
+            params_segment['point_end'], params_segment['heading_end'])
+        self.plan_view = PlanView(segments)
+
+        # Remember geometry parameters
+        self.params['curve'] = 'plan_view'
+        self.params['point_start'] = self.point_start_chain
+        self.params['heading_start'] = self.heading_start_chain
+        self.params['point_end'] = params_segment['point_end']
+        self.params['heading_end'] = params_segment['heading_end']
+        self.params['curvature_start'] = segments[0]['curvature_start']
+        self.params['curvature_end'] = segments[-1]['curvature_end']
+        self.params['length'] = self.plan_view.length
+        self.params['segments'] = segments
+        self.params['valid'] = params_segment['valid']
+
+    def sample_plan_view(self, s):
+        if len(self.segments) == 0:
+            return self.geometry_segment.sample_plan_view(s)
+        x_s, y_s, hdg, curvature = self.plan_view.evaluate(s)
+        return float(x_s), float(y_s), float(curvature), float(hdg) + pi/2
+
+    def sample_plan_view_batch(self, s):
+        if len(self.segments) == 0:
+            return self.geometry_segment.sample_plan_view_batch(s)
+        x_s, y_s, hdg, curvature = self.plan_view.evaluate(s)
+        return x_s, y_s, curvature, hdg + pi/2
+
+    def get_curvature_plan_view(self, s):
+        if len(self.segments) == 0:
+            return self.geometry_segment.get_curvature_plan_view(s)
+        _, _, _, curvature = self.plan_view.evaluate(s)
+        return curvature
+
+    def get_plan_view_breakpoints(self):
+        if len(self.segments) == 0:
+            return self.geometry_segment.get_plan_view_breakpoints()
+        return np.array([segment['s'] for segment in self.params['segments'][1:]])
@@ -20,6 +20,18 @@ from mathutils import Vector, Matrix
 
 from math import pi
 
+import hashlib
+
+import numpy as np
+
+# Index from junction ID to the names of its connecting road objects and the
+# number of OpenDRIVE objects at the time the index was last updated. It is
+# cleared whenever an operator starts creating objects since files may have been
+# loaded, changes undone or objects deleted in the meantime.
+junction_connecting_roads_index = {
+    'num_objects': None,
+    'names': {},
+}
 
 def get_new_id_opendrive(context):
     '''
@@ -55,15 +67,22 @@ def get_new_id_openscenario(context):
     dummy_obj['id_osc_next'] += 1
     return id_next
 
+def get_addon_version():
+    '''
+        Return the version of the add-on, (0, 0, 0) if it is not found.
+    '''
+    version = (0, 0, 0)
+    for mod in addon_utils.modules():
+        if mod.bl_info['name'] == 'Driving Scenario Creator':
+            version = mod.bl_info['version']
+    return version
+
 def ensure_collection_dsc(context):
     if not 'Driving Scenario Creator' in bpy.data.collections:
         collection = bpy.data.collections.new('Driving Scenario Creator')
         context.scene.collection.children.link(collection)
         # Store addon version
-        version = (0, 0, 0)
-        for mod in addon_utils.modules():
-            if mod.bl_info['name'] == 'Driving Scenario Creator':
-                version = mod.bl_info['version']
+        version = get_addon_version()
         version_obj = bpy.data.objects.new('dsc_addon_version',None)
         # Do not render
         version_obj.hide_viewport = True
@@ -148,6 +167,79 @@ def get_object_xodr_by_id(id_odr):
             if obj['id_odr'] == id_odr:
                 return obj
 
+def build_junction_connecting_roads_index():
+    '''
+        Index all junction connecting road objects by junction ID in a single
+        pass over the OpenDRIVE collection.
+    '''
+    collection = bpy.data.collections.get('OpenDRIVE')
+    names = {}
+    for obj in collection.objects:
+        if obj.name.startswith('junction_connecting_road') and 'id_junction' in obj:
+            names.setdefault(obj['id_junction'], []).append(obj.name)
+    junction_connecting_roads_index['names'] = names
+    junction_connecting_roads_index['num_objects'] = len(collection.objects)
+
+def clear_junction_connecting_roads_index():
+    '''
+        Clear the junction connecting road index, it is rebuilt on the next
+        lookup.
+    '''
+    junction_connecting_roads_index['names'] = {}
+    junction_connecting_roads_index['num_objects'] = None
+
+def index_junction_connecting_road(obj):
+    '''
+        Update the junction connecting road index after linking a connecting
+        road to a junction.
+    '''
+    collection = bpy.data.collections.get('OpenDRIVE')
+    if junction_connecting_roads_index['num_objects'] is None:
+        build_junction_connecting_roads_index()
+        return
+    for names in junction_connecting_roads_index['names'].values():
+        if obj.name in names:
+            names.remove(obj.name)
+    junction_connecting_roads_index['names'].setdefault(obj['id_junction'], []).append(obj.name)
+    junction_connecting_roads_index['num_objects'] = len(collection.objects)
+
+def get_junction_connecting_roads(id_junction):
+    '''
+        Return the connecting road objects of the junction with given ID.
+        Rebuild the index if objects were added, removed or renamed since it
+        was last updated.
+    '''
+    collection = bpy.data.collections.get('OpenDRIVE')
+    if junction_connecting_roads_index['num_objects'] != len(collection.objects):
+        build_junction_connecting_roads_index()
+    objs = []
+    for name in junction_connecting_roads_index['names'].get(id_junction, []):
+        obj = collection.objects.get(name)
+        if obj is None or obj.get('id_junction') != id_junction:
+            build_junction_connecting_roads_index()
+            return [collection.objects[name] for name in
+                junction_connecting_roads_index['names'].get(id_junction, [])]
+        objs.append(obj)
+    return objs
+
+def get_custom_properties_hash(obj):
+    '''
+        Return a hash of the name and all custom properties of an object.
+    '''
+    def to_python(value):
+        # Convert ID properties to plain Python types with a stable order
+        if hasattr(value, 'to_dict'):
+            value = value.to_dict()
+        elif hasattr(value, 'to_list'):
+            value = value.to_list()
+        if isinstance(value, dict):
+            return sorted((key, to_python(item)) for key, item in value.items())
+        if isinstance(value, (list, tuple)):
+            return [to_python(item) for item in value]
+        return value
+    properties = [(key, to_python(obj[key])) for key in sorted(obj.keys())]
+    return hashlib.sha256(repr((obj.name, properties)).encode()).hexdigest()
+
 def create_object_xodr_links(obj, link_type, cp_type_other, id_other, id_extra):
     '''
         Create OpenDRIVE predecessor/successor linkage for current object with
@@ -194,6 +286,7 @@ def create_object_xodr_links(obj, link_type, cp_type_other, id_other, id_extra):
                 # Case: connecting road (in junction) to incoming road
                 obj['id_junction'] = id_other
                 obj['id_joint_start'] = id_extra
+                index_junction_connecting_road(obj)
                 if obj_other['joints'][id_extra]['id_incoming'] != None:
                     obj['link_predecessor_id_l'] = obj_other['joints'][id_extra]['id_incoming']
                     obj['link_predecessor_cp_l'] = obj_other['joints'][id_extra]['contact_point_type']
@@ -224,6 +317,7 @@ def create_object_xodr_links(obj, link_type, cp_type_other, id_other, id_extra):
                 # Case: connecting road (in junction) to incoming road
                 obj['id_junction'] = id_other
                 obj['id_joint_end'] = id_extra
+                index_junction_connecting_road(obj)
                 if obj_other['joints'][id_extra]['id_incoming'] != None:
                     obj['link_successor_id_l'] = obj_other['joints'][id_extra]['id_incoming']
                     obj['link_successor_cp_l'] = obj_other['joints'][id_extra]['contact_point_type']
@@ -235,15 +329,13 @@ def create_object_xodr_links(obj, link_type, cp_type_other, id_other, id_extra):
             id_joint = 2
         obj['joints'][id_joint]['id_incoming'] = id_other
         # Connect connecting roads of this junction
-        for obj_jcr in bpy.data.collections['OpenDRIVE'].objects:
-            if obj_jcr.name.startswith('junction_connecting_road'):
-                if obj_jcr['id_junction'] == obj['id_odr']:
-                    if obj_jcr['id_joint_start'] == id_joint:
-                        obj_jcr['link_predecessor_id_l'] = id_other
-                        obj_jcr['link_predecessor_cp_l'] = cp_type_other
-                    elif obj_jcr['id_joint_end'] == id_joint:
-                        obj_jcr['link_successor_id_l'] = id_other
-                        obj_jcr['link_successor_cp_l'] = cp_type_other
+        for obj_jcr in get_junction_connecting_roads(obj['id_odr']):
+            if obj_jcr['id_joint_start'] == id_joint:
+                obj_jcr['link_predecessor_id_l'] = id_other
+                obj_jcr['link_predecessor_cp_l'] = cp_type_other
+            elif obj_jcr['id_joint_end'] == id_joint:
+                obj_jcr['link_successor_id_l'] = id_other
+                obj_jcr['link_successor_cp_l'] = cp_type_other
 
 
     # 2. Set the link parameters of the other object we are linking with
@@ -310,15 +402,13 @@ def create_object_xodr_links(obj, link_type, cp_type_other, id_other, id_extra):
                 obj_other['joints'][id_extra]['id_incoming'] = obj['id_odr']
                 obj_other['joints'][id_extra]['contact_point_type'] = cp_type
                 # Connect to all connecting roads of this joint
-                for obj_jcr in bpy.data.collections['OpenDRIVE'].objects:
-                    if obj_jcr.name.startswith('junction_connecting_road'):
-                        if obj_jcr['id_junction'] == id_other:
-                            if obj_jcr['id_joint_start'] == id_extra:
-                                obj_jcr['link_predecessor_id_l'] = obj['id_odr']
-                                obj_jcr['link_predecessor_cp_l'] = cp_type
-                            elif obj_jcr['id_joint_end'] == id_extra:
-                                obj_jcr['link_successor_id_l'] = obj['id_odr']
-                                obj_jcr['link_successor_cp_l'] = cp_type
+                for obj_jcr in get_junction_connecting_roads(id_other):
+                    if obj_jcr['id_joint_start'] == id_extra:
+                        obj_jcr['link_predecessor_id_l'] = obj['id_odr']
+                        obj_jcr['link_predecessor_cp_l'] = cp_type
+                    elif obj_jcr['id_joint_end'] == id_extra:
+                        obj_jcr['link_successor_id_l'] = obj['id_odr']
+                        obj_jcr['link_successor_cp_l'] = cp_type
 
 
 def get_width_road_sides(obj):
@@ -343,17 +433,6 @@ def select_activate_object(context, obj):
     obj.select_set(state=True)
     context.view_layer.objects.active = obj
 
-def remove_duplicate_vertices(context, obj):
-    '''
-        Remove duplicate vertices from a object's mesh
-    '''
-    context.view_layer.objects.active = obj
-    bpy.ops.object.editmode_toggle()
-    bpy.ops.mesh.select_all(action='SELECT')
-    bpy.ops.mesh.remove_doubles(threshold=0.001,
-                use_unselected=True, use_sharp_edge_from_normals=False)
-    bpy.ops.object.editmode_toggle()
-
 def get_mouse_vectors(context, event):
     '''
         Return view vector and ray origin of mouse pointer position.
@@ -610,24 +689,62 @@ def replace_mesh(obj, mesh):
     # Set new mesh data
     obj.data = mesh
 
-def triangulate_quad_mesh(obj):
-    '''
-        Triangulate then quadify the ngon mesh of an object.
-    '''
-    # Triangulate
-    bm = bmesh.new()
-    bm.from_mesh(obj.data)
-    bmesh.ops.triangulate(bm, faces=bm.faces[:])
-    bm.to_mesh(obj.data)
-    bm.free()
-    # Tris to quads is missing in bmesh so use bpy.ops.mesh instead
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.mesh.tris_convert_to_quads(materials=True)
-    bpy.ops.object.mode_set(mode='OBJECT')
+def create_mesh_from_arrays(name, vertices, edges, loops_vertex_index, polygons_loop_total):
+    '''
+        Create a new mesh in bulk from flat arrays of vertex coordinates, edge
+        vertex indices, loop vertex indices and number of loops per polygon.
+        Edges of the polygons are added automatically.
+    '''
+    mesh = bpy.data.meshes.new(name)
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    edges = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+    loops_vertex_index = np.asarray(loops_vertex_index, dtype=np.int32)
+    polygons_loop_total = np.asarray(polygons_loop_total, dtype=np.int32)
+    polygons_loop_start = np.zeros(polygons_loop_total.shape, dtype=np.int32)
+    np.cumsum(polygons_loop_total[:-1], out=polygons_loop_start[1:])
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set('co', vertices.ravel())
+    mesh.edges.add(len(edges))
+    mesh.edges.foreach_set('vertices', edges.ravel())
+    mesh.loops.add(len(loops_vertex_index))
+    mesh.loops.foreach_set('vertex_index', loops_vertex_index)
+    mesh.polygons.add(len(polygons_loop_total))
+    mesh.polygons.foreach_set('loop_start', polygons_loop_start)
+    # Since Blender 3.6 the loop total is derived from the loop starts
+    if bpy.app.version < (3, 6, 0):
+        mesh.polygons.foreach_set('loop_total', polygons_loop_total)
+    mesh.update(calc_edges=True)
+    return mesh
 
 def kmh_to_ms(speed):
     return speed / 3.6
 
+def get_mesh_lods(obj):
+    '''
+        Return the meshes with reduced level of detail of an object ordered
+        by level.
+    '''
+    mesh_lods = []
+    while 'mesh_lod_' + str(len(mesh_lods) + 1) in obj:
+        mesh_lods.append(obj['mesh_lod_' + str(len(mesh_lods) + 1)])
+    return mesh_lods
+
+def set_mesh_lods(obj, mesh_lods):
+    '''
+        Link the meshes with reduced level of detail to an object. The custom
+        properties referencing the meshes count as their users, so they are
+        removed together with the last object using them. Meshes previously
+        linked to the object are removed if no other object uses them.
+    '''
+    mesh_lods_old = get_mesh_lods(obj)
+    for idx_lod in range(1, len(mesh_lods_old) + 1):
+        del obj['mesh_lod_' + str(idx_lod)]
+    for idx_lod, mesh in enumerate(mesh_lods, start=1):
+        obj['mesh_lod_' + str(idx_lod)] = mesh
+    for mesh in mesh_lods_old:
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+
 def get_obj_custom_property(dsc_category, subcategory, obj_name, property):
     if collection_exists([dsc_category,subcategory]):
         for obj in bpy.data.collections[dsc_category].children[subcategory].objects:
@@ -33,6 +33,9 @@ class DSC_OT_modal_two_point_base(bpy.types.Operator):
 
     stencil = None
 
+    # Additional help text of derived operators
+    status_text_extra = ''
+
     params_input = {}
     params_snap = {}
 
@@ -194,6 +197,7 @@ class DSC_OT_modal_two_point_base(bpy.types.Operator):
         # Display help text
         if self.state == 'INIT':
             context.workspace.status_text_set('Place object by clicking, '
+                                              + self.status_text_extra +
                                               'hold CTRL to snap to grid, '
                                               'hold SHIFT to change start heading, '
                                               'hold E to adjust elevation, '
@@ -310,6 +314,8 @@ class DSC_OT_modal_two_point_base(bpy.types.Operator):
                     cp_type_end = self.params_snap['type']
                     # Create the final object
                     if self.input_valid(wireframe=False):
+                        # Objects may have changed since the last call
+                        helpers.clear_junction_connecting_roads_index()
                         obj = self.create_object_3d(context)
                         if obj != None:
                             if self.params_input['connected_start']:
@@ -108,6 +108,15 @@ class DSC_OT_popup_road_properties(bpy.types.Operator):
             row = box_params.row(align=True)
             row.label(text='Design speed:')
             row.prop(context.scene.road_properties, 'design_speed', text='')
+            row = box_params.row(align=True)
+            row.label(text='Mesh max deviation:')
+            row.prop(context.scene.road_properties, 'mesh_max_deviation', text='')
+            row = box_params.row(align=True)
+            row.label(text='Mesh levels of detail:')
+            row.prop(context.scene.road_properties, 'mesh_lod_num', text='')
+            row = box_params.row(align=True)
+            row.label(text='Mesh LOD deviation factor:')
+            row.prop(context.scene.road_properties, 'mesh_lod_factor', text='')
 
         row = box.row()
         row.label(text='Number of lanes:')
@@ -15,8 +15,15 @@ import bpy
 from mathutils import Vector
 
 from . import helpers
+from . road_mesh import road_mesh
 
-from math import ceil
+import hashlib
+
+import numpy as np
+
+# Names of the road meshes by hash of everything the mesh depends on, roads
+# with identical geometry in local coordinates and identical lanes share a mesh
+road_mesh_cache = {}
 
 class road:
 
@@ -43,34 +50,33 @@ class road:
         else:
             # Create road object
             id_obj = helpers.get_new_id_opendrive(context)
-            mesh_road.name = self.road_type + '_' + str(id_obj)
-            obj = bpy.data.objects.new(mesh_road.name, mesh_road)
+            mesh_shared = 'dsc_mesh_key' in mesh_road
+            if not mesh_shared:
+                mesh_road.name = self.road_type + '_' + str(id_obj)
+            obj = bpy.data.objects.new(self.road_type + '_' + str(id_obj), mesh_road)
             obj.matrix_world = matrix_world
             helpers.link_object_opendrive(context, obj)
 
-            # Assign materials
-            helpers.assign_road_materials(obj)
-            for idx in range(len(obj.data.polygons)):
-                if idx in materials['road_mark_white']:
-                    obj.data.polygons[idx].material_index = \
-                        helpers.get_material_index(obj, 'road_mark_white')
-                elif idx in materials['grass']:
-                    obj.data.polygons[idx].material_index = \
-                        helpers.get_material_index(obj, 'grass')
-                elif idx in materials['road_mark_yellow']:
-                    obj.data.polygons[idx].material_index = \
-                        helpers.get_material_index(obj, 'road_mark_yellow')
-                else:
-                    obj.data.polygons[idx].material_index = \
-                        helpers.get_material_index(obj, 'road_asphalt')
-            # Remove double vertices from road lanes and lane lines to simplify mesh
-            helpers.remove_duplicate_vertices(context, obj)
+            if mesh_shared:
+                # Materials and levels of detail of the shared mesh already
+                # exist, they are in use by the objects sharing the mesh
+                mesh_lods = [bpy.data.meshes.get(name) for name in mesh_road['mesh_lods']]
+                helpers.set_mesh_lods(obj, [mesh for mesh in mesh_lods if mesh is not None])
+            else:
+                # Assign materials
+                helpers.assign_road_materials(obj)
+                self.set_polygons_material_index(obj.data, materials)
+                if not wireframe:
+                    # Create meshes with reduced level of detail for export
+                    mesh_lods = self.create_lod_meshes(context, obj)
+                    helpers.set_mesh_lods(obj, mesh_lods)
+                    # Share the mesh with identical roads created later
+                    mesh_road['mesh_lods'] = [mesh.name for mesh in mesh_lods]
+                    mesh_road['dsc_mesh_key'] = self.mesh_key
+                    road_mesh_cache[self.mesh_key] = mesh_road.name
             # Make it active for the user to see what he created last
             helpers.select_activate_object(context, obj)
 
-            # Convert the ngons to tris and quads to get a defined surface for elevated roads
-            helpers.triangulate_quad_mesh(obj)
-
             # Metadata
             obj['dsc_category'] = 'OpenDRIVE'
             if self.road_type == 'junction_connecting_road':
@@ -154,14 +160,19 @@ class road:
             valid = False
             return valid, None, None, []
         length_broken_line = context.scene.road_properties.length_broken_line
+        max_deviation = context.scene.road_properties.mesh_max_deviation
         self.set_lane_params(context.scene.road_properties)
-        lanes = context.scene.road_properties.lanes
-        # Get values in t and s direction where the faces of the road start and end
-        strips_s_boundaries = self.get_strips_s_boundaries(lanes, length_broken_line)
+        if not wireframe:
+            # Reuse the mesh of an identical road
+            self.mesh_key = self.get_mesh_key(context.scene.road_properties)
+            mesh = self.get_cached_mesh(self.mesh_key)
+            if mesh is not None:
+                valid = True
+                return valid, mesh, self.geometry.matrix_world, {}
         # Calculate meshes for Blender
-        road_sample_points = self.get_road_sample_points(lanes, strips_s_boundaries)
-        vertices, edges, faces = self.get_road_vertices_edges_faces(road_sample_points)
-        materials = self.get_face_materials(lanes, strips_s_boundaries)
+        self.road_mesh = road_mesh(self.geometry, context.scene.road_properties.lanes, length_broken_line)
+        vertices, edges, loops_vertex_index, polygons_loop_total, materials = \
+            self.road_mesh.get_mesh_arrays(max_deviation)
 
         if wireframe:
             # Transform start and end point to local coordinate system then add
@@ -174,18 +185,114 @@ class road:
             point_end_local = self.geometry.matrix_world.inverted() @ point_end
             point_end_local.z = point_end.z - point_start.z
             point_end_bottom = (point_end_local.x, point_end_local.y, -point_start.z)
-            vertices += [point_start_local[:], point_start_bottom, point_end_local[:], point_end_bottom]
-            edges += [[len(vertices)-1, len(vertices)-2], [len(vertices)-3, len(vertices)-4]]
+            num_vertices = len(vertices)
+            vertices = np.concatenate((vertices,
+                [point_start_local, point_start_bottom, point_end_local[:], point_end_bottom]))
+            edges = np.concatenate((edges,
+                [[num_vertices + 3, num_vertices + 2], [num_vertices + 1, num_vertices]]))
 
         # Create blender mesh
-        mesh = bpy.data.meshes.new('temp_road')
         if not wireframe:
-            mesh.from_pydata(vertices, edges, faces)
+            mesh = helpers.create_mesh_from_arrays('temp_road', vertices, edges,
+                loops_vertex_index, polygons_loop_total)
         else:
-            mesh.from_pydata(vertices, edges, [])
+            mesh = helpers.create_mesh_from_arrays('temp_road', vertices, edges, [], [])
         valid = True
         return valid, mesh, self.geometry.matrix_world, materials
 
+    def get_mesh_key(self, road_properties):
+        '''
+            Return a hash of everything the road mesh depends on: the
+            geometry in local coordinates, the lanes and the mesh settings.
+            Each value is quantized by the largest change of the road
+            position it can cause, with a step of a tenth of the maximum mesh
+            deviation. Roads placed with different position and heading
+            (single precision) still get the same key while roads sharing a
+            key differ by less than the mesh deviation.
+        '''
+        params = self.geometry.params
+        length = params['length']
+        step = road_properties.mesh_max_deviation / 10
+        lengths = [length]
+        # Curvatures move the road end by up to curvature * length**2 / 2
+        curvatures = [params['curvature_start'], params['curvature_end']]
+        # Coefficients and the length they are multiplied with
+        coefficients = []
+        values_segment = []
+        if params['curve'] == 'parampoly3':
+            # Curvatures and length do not define the shape of the polynomial,
+            # its coefficients are in m since the parameter is normalized
+            coefficients.extend((coefficient, 1.0) for coefficient in params['coefficients_u'])
+            coefficients.extend((coefficient, 1.0) for coefficient in params['coefficients_v'])
+        if params['curve'] == 'plan_view':
+            for segment in params['segments']:
+                values_segment.append(segment['curve'])
+                lengths.extend([segment['s'], segment['length']])
+                curvatures.extend([segment['curvature_start'], segment['curvature_end']])
+        coefficients.extend((curvature, length**2 / 2) for curvature in curvatures)
+        for elevation in params['elevation']:
+            lengths.append(elevation['s'])
+            coefficients.extend([(elevation['a'], 1.0), (elevation['b'], length),
+                (elevation['c'], length**2), (elevation['d'], length**3)])
+        lanes = []
+        for lane in road_properties.lanes:
+            lengths.extend([lane.width, lane.road_mark_width])
+            lanes.append((lane.side, lane.type, lane.width_change, lane.road_mark_type, lane.road_mark_color))
+        lengths.append(road_properties.length_broken_line)
+        values = [params['curve'], values_segment, lanes, road_properties.mesh_lod_num,
+            round(road_properties.mesh_lod_factor, 6), round(road_properties.mesh_max_deviation, 6),
+            [round(value / step) for value in lengths],
+            [round(coefficient * factor / step) for coefficient, factor in coefficients]]
+        return hashlib.sha256(repr(values).encode()).hexdigest()[:32]
+
+    def get_cached_mesh(self, mesh_key):
+        '''
+            Return the mesh of a previously created road with the same mesh
+            key or None if there is no such mesh.
+        '''
+        mesh_name = road_mesh_cache.get(mesh_key)
+        if mesh_name is None:
+            return None
+        mesh = bpy.data.meshes.get(mesh_name)
+        # The mesh might have been removed or renamed in the meantime
+        if mesh is None or mesh.get('dsc_mesh_key') != mesh_key:
+            del road_mesh_cache[mesh_key]
+            return None
+        return mesh
+
+    def set_polygons_material_index(self, mesh, materials):
+        '''
+            Set the material index of all polygons of a road mesh based on the
+            dictionary with the polygon indices of each material.
+        '''
+        material_indices = {material.name: idx for idx, material in enumerate(mesh.materials)}
+        polygons_material_index = np.full(len(mesh.polygons),
+            material_indices['road_asphalt'], dtype=np.int32)
+        for material in ['road_mark_yellow', 'grass', 'road_mark_white']:
+            polygons_material_index[materials[material]] = material_indices[material]
+        mesh.polygons.foreach_set('material_index', polygons_material_index)
+
+    def create_lod_meshes(self, context, obj):
+        '''
+            Create the meshes with reduced level of detail of a road object
+            and return them. The lane profile and sample density of
+            the full detail mesh are reused, only sampling and meshing are
+            repeated for each level.
+        '''
+        road_properties = context.scene.road_properties
+        mesh_lods = []
+        for idx_lod in range(1, road_properties.mesh_lod_num + 1):
+            vertices, edges, loops_vertex_index, polygons_loop_total, materials = \
+                self.road_mesh.get_lod_mesh_arrays(idx_lod, road_properties.mesh_max_deviation,
+                    road_properties.mesh_lod_factor)
+            mesh = helpers.create_mesh_from_arrays(obj.name + '_lod' + str(idx_lod),
+                vertices, edges, loops_vertex_index, polygons_loop_total)
+            for material in obj.data.materials:
+                mesh.materials.append(material)
+            self.set_polygons_material_index(mesh, materials)
+            mesh_lods.append(mesh)
+        return mesh_lods
+
     def set_lane_params(self, road_properties):
         '''
             Set the lane parameters dictionary for later export.
@@ -282,402 +389,3 @@ class road:
                                 self.params['lanes_right_widths_change'][idx] == 'close')):
                         t_cp_split -= self.params['lanes_right_widths'][idx]
         return t_cp_split
-
-    def get_width_road_left(self, lanes):
-        '''
-            Return the width of the left road side calculated by suming up all
-            lane widths.
-        '''
-        width_road_left = 0
-        for idx, lane in enumerate(lanes):
-            if idx == 0:
-                if lane.road_mark_type != 'none':
-                    # If first lane has a line we need to add half its width
-                    width_line = lane.road_mark_width
-                    if lane.road_mark_type == 'solid_solid' or \
-                        lane.road_mark_type == 'solid_broken' or \
-                        lane.road_mark_type == 'broken_solid':
-                            width_road_left += width_line * 3.0 / 2.0
-                    else:
-                        width_road_left += width_line / 2.0
-            # Stop when reaching the right side
-            if lane.side == 'right':
-                break
-            if lane.side == 'left':
-                width_road_left += lane.width
-        return width_road_left
-
-    def get_strips_t_values(self, lanes, s):
-        '''
-            Return list of t values of strip borders.
-        '''
-        t = self.get_width_road_left(lanes)
-        t_values = []
-        # Make sure the road has a non-zero length
-        if self.geometry.params['length'] == 0:
-            return t_values
-        # Build up t values lane by lane
-        for idx_lane, lane in enumerate(lanes):
-            s_norm = s / self.geometry.params['length']
-            if lane.width_change == 'open':
-                lane_width_s = (3.0 * s_norm**2 - 2.0 * s_norm**3) * lane.width
-            elif lane.width_change == 'close':
-                lane_width_s = (1.0 - 3.0 * s_norm**2 + 2.0 * s_norm**3) * lane.width
-            else:
-                lane_width_s = lane.width
-            # Add lane width for right side of road BEFORE (in t-direction) road mark lines
-            if lane.side == 'right':
-                width_left_lines_on_lane = 0.0
-                if lanes[idx_lane - 1].road_mark_type != 'none':
-                    width_line = lanes[idx_lane - 1].road_mark_width
-                    if lanes[idx_lane - 1].road_mark_type == 'solid_solid' or \
-                            lanes[idx_lane - 1].road_mark_type == 'solid_broken' or \
-                            lanes[idx_lane - 1].road_mark_type == 'broken_solid':
-                        width_left_lines_on_lane = width_line * 3.0 / 2.0
-                    else:
-                        width_left_lines_on_lane = width_line / 2.0
-                width_right_lines_on_lane = 0.0
-                if lane.road_mark_type != 'none':
-                    width_line = lane.road_mark_width
-                    if lane.road_mark_type == 'solid_solid' or \
-                            lane.road_mark_type == 'solid_broken' or \
-                            lane.road_mark_type == 'broken_solid':
-                        width_right_lines_on_lane = width_line * 3.0 / 2.0
-                    else:
-                        width_right_lines_on_lane = width_line / 2.0
-                t -= lane_width_s - width_left_lines_on_lane - width_right_lines_on_lane
-            # Add road mark lines
-            if lane.road_mark_type != 'none':
-                width_line = lane.road_mark_width
-                if lane.road_mark_type == 'solid_solid' or \
-                        lane.road_mark_type == 'solid_broken' or \
-                        lane.road_mark_type == 'broken_solid':
-                    t_values.append(t)
-                    t_values.append(t -       width_line)
-                    t_values.append(t - 2.0 * width_line)
-                    t_values.append(t - 3.0 * width_line)
-                    t = t - 3.0 * width_line
-                else:
-                    t_values.append(t)
-                    t_values.append(t - width_line)
-                    t -= width_line
-            else:
-                t_values.append(t)
-            # Add lane width for left side of road AFTER (in t-direction) road mark lines
-            if lane.side == 'left':
-                width_left_lines_on_lane = 0
-                if lane.road_mark_type != 'none':
-                    width_line = lane.road_mark_width
-                    if lane.road_mark_type == 'solid_solid' or \
-                            lane.road_mark_type == 'solid_broken' or \
-                            lane.road_mark_type == 'broken_solid':
-                        width_left_lines_on_lane = width_line * 3.0 / 2.0
-                    else:
-                        width_left_lines_on_lane = width_line / 2.0
-                width_right_lines_on_lane = 0
-                if lanes[idx_lane + 1].road_mark_type != 'none':
-                    width_line = lanes[idx_lane + 1].road_mark_width
-                    if lanes[idx_lane + 1].road_mark_type == 'solid_solid' or \
-                            lanes[idx_lane + 1].road_mark_type == 'solid_broken' or \
-                            lanes[idx_lane + 1].road_mark_type == 'broken_solid':
-                        width_right_lines_on_lane = width_line * 3.0 / 2.0
-                    else:
-                        width_right_lines_on_lane = width_line / 2.0
-                t -= lane_width_s - width_left_lines_on_lane - width_right_lines_on_lane
-        return t_values
-
-    def get_strips_s_boundaries(self, lanes, length_broken_line):
-        '''
-            Return list of tuples with a line marking toggle flag and a list
-            with the start and stop values of the faces in each strip.
-        '''
-        # Calculate line parameters
-        # TODO offset must be provided by predecessor road for each marking
-        length = self.geometry.params['length']
-        offset = 0.5
-        if offset < length_broken_line:
-            offset_first = offset
-            line_toggle_start = True
-        else:
-            offset_first = offset % length_broken_line
-            line_toggle_start = False
-        s_values = []
-        for lane in lanes:
-            # Calculate broken line parameters
-            if lane.road_mark_type == 'broken':
-                num_faces_strip_line = ceil((length \
-                                        - (length_broken_line - offset_first)) \
-                                       / length_broken_line)
-                # Add one extra step for the shorter first piece
-                if offset_first > 0:
-                    num_faces_strip_line += 1
-                length_first = min(length, length_broken_line - offset_first)
-                if num_faces_strip_line > 1:
-                    length_last = length - length_first - (num_faces_strip_line - 2) * length_broken_line
-                else:
-                    length_last = length_first
-            else:
-                num_faces_strip_line = 1
-
-            # Go in s direction along lane and calculate the start and stop values
-            # ASPHALT
-            if lane.side == 'right':
-                s_values.append((line_toggle_start, [0, length]))
-            # ROAD MARK
-            if lane.road_mark_type != 'none':
-                s_values_strip = [0]
-                for idx_face_strip in range(num_faces_strip_line):
-                    # Calculate end points of the faces
-                    s_stop = length
-                    if lane.road_mark_type == 'broken':
-                        if idx_face_strip == 0:
-                            # First piece
-                            s_stop = length_first
-                        elif idx_face_strip > 0 and idx_face_strip + 1 == num_faces_strip_line:
-                            # Last piece and more than one piece
-                            s_stop = length_first + (idx_face_strip - 1) * length_broken_line \
-                                    + length_last
-                        else:
-                            # Middle piece
-                            s_stop = length_first + idx_face_strip * length_broken_line
-                    s_values_strip.append(s_stop)
-                if lane.road_mark_type == 'solid_solid':
-                    s_values.append((line_toggle_start, s_values_strip))
-                    s_values.append((line_toggle_start, s_values_strip))
-                s_values.append((line_toggle_start, s_values_strip))
-            # ASPHALT
-            if lane.side == 'left':
-                s_values.append((line_toggle_start, [0, length]))
-        return s_values
-
-    def get_road_sample_points(self, lanes, strips_s_boundaries):
-        '''
-            Adaptively sample road in s direction based on local curvature.
-        '''
-        length = self.geometry.params['length']
-        s = 0
-        strips_t_values = self.get_strips_t_values(lanes, s)
-        # Obtain first curvature value
-        xyz_samples, curvature_abs = self.geometry.sample_cross_section(0, strips_t_values)
-        # We need 2 vectors for each strip to later construct the faces with one
-        # list per face on each side of each strip
-        sample_points = [[[]] for _ in range(2 * (len(strips_t_values) - 1))]
-        t_offset = 0
-        for idx_t in range(len(strips_t_values) - 1):
-            sample_points[2 * idx_t][0].append((0, strips_t_values[idx_t], 0))
-            sample_points[2 * idx_t + 1][0].append((0, strips_t_values[idx_t + 1], 0))
-        # Concatenate vertices until end of road
-        idx_boundaries_strips = [0] * len(strips_s_boundaries)
-        while s < length:
-            # TODO: Make hardcoded sampling parameters configurable
-            if curvature_abs == 0:
-                step = 5
-            else:
-                step = max(1, min(5, 0.1 / abs(curvature_abs)))
-            s += step
-            if s >= length:
-                s = length
-
-            # Sample next points along road geometry (all t values for current s value)
-            strips_t_values = self.get_strips_t_values(lanes, s)
-            xyz_samples, curvature_abs = self.geometry.sample_cross_section(s, strips_t_values)
-            point_index = -2
-            while point_index < len(sample_points) - 2:
-                point_index = point_index + 2
-                if not sample_points[point_index][0]:
-                    continue
-                idx_strip = point_index//2
-                # Get the boundaries of road marking faces for current strip plus left and right
-                idx_boundaries = [0, 0, 0]
-                s_boundaries_next = [length, length, length]
-                # Check if there is a strip left and/or right to take into account
-                if idx_strip > 0:
-                    idx_boundaries[0] = idx_boundaries_strips[idx_strip - 1]
-                    s_boundaries_next[0] = strips_s_boundaries[idx_strip - 1][1][idx_boundaries[0] + 1]
-                idx_boundaries[1] = idx_boundaries_strips[idx_strip]
-                s_boundaries_next[1] = strips_s_boundaries[idx_strip][1][idx_boundaries[1] + 1]
-                if idx_strip < len(strips_s_boundaries) - 1:
-                    idx_boundaries[2] = idx_boundaries_strips[idx_strip + 1]
-                    s_boundaries_next[2] = strips_s_boundaries[idx_strip + 1][1][idx_boundaries[2] + 1]
-
-                # Check if any face boundary is smaller than sample point
-                smaller, idx_smaller = self.compare_boundaries_with_s(s, s_boundaries_next)
-                if smaller:
-                    # Find all boundaries in between
-                    while smaller:
-                        # Sample the geometry
-                        t_values = [strips_t_values[idx_strip], strips_t_values[idx_strip + 1]]
-                        xyz_boundary, curvature_abs = self.geometry.sample_cross_section(
-                            s_boundaries_next[idx_smaller], t_values)
-                        if idx_smaller == 0:
-                            # Append left extra point
-                            sample_points[2 * idx_strip][idx_boundaries[1]].append(xyz_boundary[0])
-                        if idx_smaller == 1:
-                            # Append left and right points
-                            sample_points[2 * idx_strip][idx_boundaries[1]].append(xyz_boundary[0])
-                            sample_points[2 * idx_strip + 1][idx_boundaries[1]].append(xyz_boundary[1])
-                            # Start a new list for next face
-                            sample_points[2 * idx_strip].append([xyz_boundary[0]])
-                            sample_points[2 * idx_strip + 1].append([xyz_boundary[1]])
-                        if idx_smaller == 2:
-                            # Append right extra point
-                            sample_points[2 * idx_strip + 1][idx_boundaries[1]].append(xyz_boundary[1])
-                        # Get the next boundary (relative to this strip)
-                        idx_boundaries[idx_smaller] += 1
-                        idx_strip_relative = idx_strip + idx_smaller - 1
-                        s_boundaries_next[idx_smaller] = \
-                            strips_s_boundaries[idx_strip_relative][1][idx_boundaries[idx_smaller] + 1]
-                        # Check again
-                        smaller, idx_smaller = self.compare_boundaries_with_s(s, s_boundaries_next)
-                    # Write back indices to global array (only left strip to avoid cross interference!)
-                    if idx_strip > 0:
-                        idx_boundaries_strips[idx_strip - 1] = idx_boundaries[0]
-
-                # Now there is no boundary in between anymore so append the samples
-                sample_points[2 * idx_strip][idx_boundaries[1]].append(xyz_samples[idx_strip])
-                sample_points[2 * idx_strip + 1][idx_boundaries[1]].append(xyz_samples[idx_strip + 1])
-        return sample_points
-
-    def compare_boundaries_with_s(self, s, s_boundaries_next):
-        '''
-            Return True if any boundary is smaller than s, also return the index
-            to the boundary.
-        '''
-        smaller = False
-        idx_sorted = sorted(range(len(s_boundaries_next)), key=s_boundaries_next.__getitem__)
-        if s_boundaries_next[idx_sorted[0]] < s:
-            smaller = True
-
-        return smaller, idx_sorted[0]
-
-    def get_road_vertices_edges_faces(self, road_sample_points):
-        '''
-           generate mesh from samplepoints
-        '''
-        vertices = []
-        edges = []
-        faces = []
-        idx_vertex = 0
-        point_index = 0
-        while point_index < len(road_sample_points):
-            for idx_face_strip in range(len(road_sample_points[point_index])):
-                # ignore empty samplepoints, it may be none type line or any thing that doesn't need to build a mesh
-                if not road_sample_points[point_index][0]:
-                    continue
-                samples_right = road_sample_points[point_index + 1][idx_face_strip]
-                samples_left = road_sample_points[point_index][idx_face_strip]
-                num_vertices = len(samples_left) + len(samples_right)
-                vertices += samples_right + samples_left[::-1]
-                edges += [[idx_vertex + n, idx_vertex + n + 1] for n in range(num_vertices - 1)] \
-                         + [[idx_vertex + num_vertices - 1, idx_vertex]]
-                faces += [[idx_vertex + n for n in range(num_vertices)]]
-                idx_vertex += num_vertices
-            point_index = point_index + 2
-        return vertices, edges, faces
-
-    def get_strip_to_lane_mapping(self, lanes):
-        '''
-            Return list of lane indices for strip indices.
-        '''
-        strip_to_lane = []
-        strip_is_road_mark = []
-        for idx_lane, lane in enumerate(lanes):
-            if lane.side == 'left':
-                if lane.road_mark_type != 'none':
-                    if lane.road_mark_type == 'solid' or \
-                        lane.road_mark_type == 'broken':
-                        strip_to_lane.append(idx_lane)
-                        strip_is_road_mark.append(True)
-                    else:
-                        # Double line
-                        strip_to_lane.append(idx_lane)
-                        strip_to_lane.append(idx_lane)
-                        strip_to_lane.append(idx_lane)
-                        strip_is_road_mark.append(True)
-                        strip_is_road_mark.append(False)
-                        strip_is_road_mark.append(True)
-                strip_to_lane.append(idx_lane)
-                strip_is_road_mark.append(False)
-            elif lane.side == 'center':
-                if lane.road_mark_type != 'none':
-                    if lane.road_mark_type == 'solid' or \
-                        lane.road_mark_type == 'broken':
-                        strip_to_lane.append(idx_lane)
-                        strip_is_road_mark.append(True)
-                    else:
-                        # Double line
-                        strip_to_lane.append(idx_lane)
-                        strip_to_lane.append(idx_lane)
-                        strip_to_lane.append(idx_lane)
-                        strip_is_road_mark.append(True)
-                        strip_is_road_mark.append(False)
-                        strip_is_road_mark.append(True)
-            else:
-                # lane.side == 'right'
-                strip_to_lane.append(idx_lane)
-                strip_is_road_mark.append(False)
-                if lane.road_mark_type != 'none':
-                    if lane.road_mark_type == 'solid' or \
-                        lane.road_mark_type == 'broken':
-                        strip_to_lane.append(idx_lane)
-                        strip_is_road_mark.append(True)
-                    else:
-                        # Double line
-                        strip_to_lane.append(idx_lane)
-                        strip_to_lane.append(idx_lane)
-                        strip_to_lane.append(idx_lane)
-                        strip_is_road_mark.append(True)
-                        strip_is_road_mark.append(False)
-                        strip_is_road_mark.append(True)
-        return strip_to_lane, strip_is_road_mark
-
-    def get_road_mark_material(self, color):
-        '''
-            Return material name for road mark color.
-        '''
-        mapping_color_material = {
-            'white': 'road_mark_white',
-            'yellow': 'road_mark_yellow',
-        }
-        return mapping_color_material[color]
-
-    def get_face_materials(self, lanes, strips_s_boundaries):
-        '''
-            Return dictionary with index of faces for each material.
-        '''
-        materials = {'asphalt': [], 'road_mark_white': [], 'road_mark_yellow': [], 'grass': []}
-        idx_face = 0
-        strip_to_lane, strip_is_road_mark = self.get_strip_to_lane_mapping(lanes)
-        for idx_strip in range(len(strips_s_boundaries)):
-            idx_lane = strip_to_lane[idx_strip]
-            if strip_is_road_mark[idx_strip]:
-                line_toggle = strips_s_boundaries[idx_strip][0]
-                num_faces = int(len(strips_s_boundaries[idx_strip][1]) - 1)
-                material = self.get_road_mark_material(lanes[idx_lane].road_mark_color)
-                # Step through faces of a road mark strip
-                for idx in range(num_faces):
-                    # Determine material
-                    if lanes[idx_lane].road_mark_type == 'solid':
-                        materials[material].append(idx_face)
-                        idx_face += 1
-                    elif lanes[idx_lane].road_mark_type == 'broken':
-                        if line_toggle:
-                            materials[material].append(idx_face)
-                            line_toggle = False
-                        else:
-                            materials['asphalt'].append(idx_face)
-                            line_toggle = True
-                        idx_face += 1
-                    elif lanes[idx_lane].road_mark_type == 'solid_solid':
-                        materials[material].append(idx_face)
-                        idx_face += 1
-            else:
-                if lanes[idx_lane].type == 'median':
-                    materials['grass'].append(idx_face)
-                elif lanes[idx_lane].type == 'shoulder':
-                    materials['grass'].append(idx_face)
-                else:
-                    materials['asphalt'].append(idx_face)
-                idx_face += 1
-
-        return materials
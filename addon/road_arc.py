@@ -13,6 +13,7 @@
 
 from . road_base import DSC_OT_road
 from . geometry_arc import DSC_geometry_arc
+from . geometry_plan_view import DSC_geometry_plan_view
 
 
 class DSC_OT_road_arc(DSC_OT_road):
@@ -24,4 +25,4 @@ class DSC_OT_road_arc(DSC_OT_road):
     object_type = 'road_arc'
     snap_filter = 'OpenDRIVE'
 
-    geometry = DSC_geometry_arc()
+    geometry = DSC_geometry_plan_view(DSC_geometry_arc())
@@ -15,6 +15,7 @@ import bpy
 from mathutils import Vector
 
 from . modal_two_point_base import DSC_OT_modal_two_point_base
+from . geometry_plan_view import DSC_geometry_plan_view
 from . road import road
 
 
@@ -37,6 +38,8 @@ class DSC_OT_road(DSC_OT_modal_two_point_base):
             Create a model object instance
         '''
         self.road = road(context, self.object_type, self.geometry, self.geometry_solver)
+        if isinstance(self.geometry, DSC_geometry_plan_view):
+            self.status_text_extra = 'ALT+LEFTMOUSE to add a segment, '
 
     def create_object_3d(self, context):
         '''
@@ -52,4 +55,31 @@ class DSC_OT_road(DSC_OT_modal_two_point_base):
             self.road.update_params_get_mesh(context, self.params_input, wireframe)
         if not valid:
             self.report({'WARNING'}, 'No valid road geometry solution found!')
-        return valid, mesh, self.geometry.matrix_world, materials
\ No newline at end of file
+        return valid, mesh, self.geometry.matrix_world, materials
+
+    def calculate_heading_end(self, point_start, heading_start, point_end):
+        # The last segment of a chain starts at the end of the fixed segments
+        if isinstance(self.geometry, DSC_geometry_plan_view) and len(self.geometry.segments) > 0:
+            point_start = self.geometry.point_end_chain
+            heading_start = self.geometry.heading_end_chain
+        return super().calculate_heading_end(point_start, heading_start, point_end)
+
+    def reset_modal_state(self):
+        super().reset_modal_state()
+        if isinstance(self.geometry, DSC_geometry_plan_view):
+            self.geometry.clear_segments()
+
+    def modal(self, context, event):
+        if isinstance(self.geometry, DSC_geometry_plan_view) and self.state == 'SELECT_END':
+            # Fix the current segment and continue the road from its end
+            if event.type == 'LEFTMOUSE' and event.value == 'RELEASE' and event.alt:
+                if self.input_valid(wireframe=False) and self.geometry.params['valid']:
+                    self.geometry.append_segment()
+                return {'RUNNING_MODAL'}
+            # Remove the last fixed segment
+            if event.type == 'RIGHTMOUSE' and event.value == 'RELEASE' \
+                    and len(self.geometry.segments) > 0:
+                self.geometry.remove_segment()
+                self.update_stencil(context, update_start=False)
+                return {'RUNNING_MODAL'}
+        return super().modal(context, event)
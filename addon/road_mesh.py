@@ -0,0 +1,631 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+    Road meshing without Blender. Takes a road geometry and lane parameters
+    and returns flat NumPy arrays with the vertices, edges and polygons of
+    the road mesh and the polygon indices of each material. The lanes can be
+    the lanes of the road properties in Blender or any objects with the same
+    attributes, see road_mesh_lane. Neither this module nor the geometry
+    modules import bpy. To use them in plain Python import the add-on
+    directory as a package without running the add-on registration:
+
+        package = types.ModuleType('dsc')
+        package.__path__ = ['path/to/addon']
+        sys.modules['dsc'] = package
+        from dsc.road_mesh import road_mesh, get_lanes_cross_section
+        from dsc.geometry_arc import DSC_geometry_arc
+
+        geometry = DSC_geometry_arc()
+        geometry.update(params_input, 'default')
+        mesh = road_mesh(geometry, get_lanes_cross_section('eka1_rq31'), 3.0)
+        vertices, edges, loops_vertex_index, polygons_loop_total, materials = \
+            mesh.get_mesh_arrays(max_deviation=0.01)
+'''
+
+from . params_cross_section import params_cross_section
+
+from math import ceil
+
+import numpy as np
+
+
+class road_mesh_lane:
+    '''
+        Lane parameters used for meshing, named like the properties of the
+        lanes in the road properties.
+    '''
+
+    def __init__(self, side, type, width, width_change, road_mark_type,
+                 road_mark_color, road_mark_width):
+        self.side = side
+        self.type = type
+        self.width = width
+        self.width_change = width_change
+        self.road_mark_type = road_mark_type
+        self.road_mark_color = road_mark_color
+        self.road_mark_width = road_mark_width
+
+def get_lanes_cross_section(cross_section_preset):
+    '''
+        Return list of lanes for a cross section preset.
+    '''
+    params = params_cross_section[cross_section_preset]
+    lanes = []
+    for idx in range(len(params['sides'])):
+        lanes.append(road_mesh_lane(params['sides'][idx], params['types'][idx],
+            params['widths'][idx], params['widths_change'][idx], params['road_mark_types'][idx],
+            params['road_mark_colors'][idx], params['road_mark_widths'][idx]))
+    return lanes
+
+class road_mesh:
+
+    # Neighbouring border samples closer than this distance are merged
+    distance_merge = 1e-6
+
+    # Smallest distance in m between samples along s, limits the number of
+    # vertices at curvature peaks at the cost of a larger deviation there
+    length_sample_min = 0.1
+
+    def __init__(self, geometry, lanes, length_broken_line):
+        self.geometry = geometry
+        self.lanes = lanes
+        # Get values in t and s direction where the faces of the road start and end
+        self.strips_s_boundaries = self.get_strips_s_boundaries(lanes, length_broken_line)
+        # Borders of the strips in t direction along the road
+        self.strips_t_profile = self.get_strips_t_profile(lanes)
+        # Sample density along the road, calculated once for all levels of detail
+        self.sample_density = None
+
+    def get_mesh_arrays(self, max_deviation, road_mark_detail='full'):
+        '''
+            Return the vertices, the edges, the vertex index of each polygon
+            loop, the number of loops of each polygon and a dictionary with
+            the polygon indices of each material. Road mark detail 'solid'
+            drops broken lines, 'none' drops all road marks.
+        '''
+        if road_mark_detail == 'full':
+            strips_t_profile = self.strips_t_profile
+            strips_s_boundaries = self.strips_s_boundaries
+            face_materials = self.get_face_materials(self.lanes, strips_s_boundaries)
+        else:
+            strips_t_profile, strips_s_boundaries, face_materials = self.get_strips_lod(
+                self.lanes, self.strips_t_profile, self.strips_s_boundaries, road_mark_detail)
+        if self.sample_density is None:
+            self.sample_density = self.get_road_sample_density(self.strips_t_profile)
+        s_samples = self.get_road_s_samples(self.sample_density, max_deviation)
+        return self.get_road_mesh_arrays(strips_t_profile, strips_s_boundaries,
+            face_materials, s_samples)
+
+    def get_lod_mesh_arrays(self, idx_lod, max_deviation, lod_factor):
+        '''
+            Return the mesh arrays for a level of detail. Level k is sampled
+            with the maximum deviation multiplied by the LOD factor to the
+            power of k. Level 1 drops broken lines, level 2 and above drop
+            all road marks.
+        '''
+        if idx_lod == 0:
+            road_mark_detail = 'full'
+        elif idx_lod == 1:
+            road_mark_detail = 'solid'
+        else:
+            road_mark_detail = 'none'
+        return self.get_mesh_arrays(max_deviation * lod_factor**idx_lod, road_mark_detail)
+
+    def get_width_road_left(self, lanes):
+        '''
+            Return the width of the left road side calculated by suming up all
+            lane widths.
+        '''
+        width_road_left = 0
+        for idx, lane in enumerate(lanes):
+            if idx == 0:
+                if lane.road_mark_type != 'none':
+                    # If first lane has a line we need to add half its width
+                    width_line = lane.road_mark_width
+                    if lane.road_mark_type == 'solid_solid' or \
+                        lane.road_mark_type == 'solid_broken' or \
+                        lane.road_mark_type == 'broken_solid':
+                            width_road_left += width_line * 3.0 / 2.0
+                    else:
+                        width_road_left += width_line / 2.0
+            # Stop when reaching the right side
+            if lane.side == 'right':
+                break
+            if lane.side == 'left':
+                width_road_left += lane.width
+        return width_road_left
+
+    def get_width_road_mark_on_lane(self, lane):
+        '''
+            Return the width of the road mark lines of a lane reaching into
+            the neighbouring lanes on each side.
+        '''
+        if lane.road_mark_type == 'none':
+            return 0.0
+        if lane.road_mark_type == 'solid_solid' or \
+                lane.road_mark_type == 'solid_broken' or \
+                lane.road_mark_type == 'broken_solid':
+            return lane.road_mark_width * 3.0 / 2.0
+        else:
+            return lane.road_mark_width / 2.0
+
+    def get_strips_t_profile(self, lanes):
+        '''
+            Return the t profile of the strip borders as two arrays with one
+            value per border: a constant t offset and the factor of the cubic
+            term 3 * s_norm**2 - 2 * s_norm**3. The factor is only non-zero
+            for borders affected by opening or closing lanes.
+        '''
+        t = self.get_width_road_left(lanes)
+        t_cubic = 0.0
+        t_offsets = []
+        t_cubics = []
+        # Build up t profile lane by lane
+        for idx_lane, lane in enumerate(lanes):
+            if lane.width_change == 'open':
+                width_offset, width_cubic = 0.0, lane.width
+            elif lane.width_change == 'close':
+                width_offset, width_cubic = lane.width, -lane.width
+            else:
+                width_offset, width_cubic = lane.width, 0.0
+            # Add lane width for right side of road BEFORE (in t-direction) road mark lines
+            if lane.side == 'right':
+                t -= width_offset - self.get_width_road_mark_on_lane(lanes[idx_lane - 1]) \
+                    - self.get_width_road_mark_on_lane(lane)
+                t_cubic -= width_cubic
+            # Add road mark lines
+            if lane.road_mark_type != 'none':
+                width_line = lane.road_mark_width
+                if lane.road_mark_type == 'solid_solid' or \
+                        lane.road_mark_type == 'solid_broken' or \
+                        lane.road_mark_type == 'broken_solid':
+                    num_lines = 3
+                else:
+                    num_lines = 1
+                for idx_line in range(num_lines + 1):
+                    t_offsets.append(t - idx_line * width_line)
+                    t_cubics.append(t_cubic)
+                t -= num_lines * width_line
+            else:
+                t_offsets.append(t)
+                t_cubics.append(t_cubic)
+            # Add lane width for left side of road AFTER (in t-direction) road mark lines
+            if lane.side == 'left':
+                t -= width_offset - self.get_width_road_mark_on_lane(lane) \
+                    - self.get_width_road_mark_on_lane(lanes[idx_lane + 1])
+                t_cubic -= width_cubic
+        return np.array(t_offsets, dtype=np.float64), np.array(t_cubics, dtype=np.float64)
+
+    def get_strips_t_values(self, strips_t_profile, s):
+        '''
+            Return array of t values of strip borders with one row for each
+            value in the array of s values.
+        '''
+        t_offsets, t_cubics = strips_t_profile
+        s_norm = np.asarray(s, dtype=np.float64) / self.geometry.params['length']
+        return t_offsets + np.multiply.outer(3.0 * s_norm**2 - 2.0 * s_norm**3, t_cubics)
+
+    def get_strips_s_boundaries(self, lanes, length_broken_line):
+        '''
+            Return list of tuples with a line marking toggle flag and a list
+            with the start and stop values of the faces in each strip.
+        '''
+        # Calculate line parameters
+        # TODO offset must be provided by predecessor road for each marking
+        length = self.geometry.params['length']
+        offset = 0.5
+        if offset < length_broken_line:
+            offset_first = offset
+            line_toggle_start = True
+        else:
+            offset_first = offset % length_broken_line
+            line_toggle_start = False
+        s_values = []
+        for lane in lanes:
+            # Calculate broken line parameters
+            if lane.road_mark_type == 'broken':
+                num_faces_strip_line = ceil((length \
+                                        - (length_broken_line - offset_first)) \
+                                       / length_broken_line)
+                # Add one extra step for the shorter first piece
+                if offset_first > 0:
+                    num_faces_strip_line += 1
+                length_first = min(length, length_broken_line - offset_first)
+                if num_faces_strip_line > 1:
+                    length_last = length - length_first - (num_faces_strip_line - 2) * length_broken_line
+                else:
+                    length_last = length_first
+            else:
+                num_faces_strip_line = 1
+
+            # Go in s direction along lane and calculate the start and stop values
+            # ASPHALT
+            if lane.side == 'right':
+                s_values.append((line_toggle_start, [0, length]))
+            # ROAD MARK
+            if lane.road_mark_type != 'none':
+                s_values_strip = [0]
+                for idx_face_strip in range(num_faces_strip_line):
+                    # Calculate end points of the faces
+                    s_stop = length
+                    if lane.road_mark_type == 'broken':
+                        if idx_face_strip == 0:
+                            # First piece
+                            s_stop = length_first
+                        elif idx_face_strip > 0 and idx_face_strip + 1 == num_faces_strip_line:
+                            # Last piece and more than one piece
+                            s_stop = length_first + (idx_face_strip - 1) * length_broken_line \
+                                    + length_last
+                        else:
+                            # Middle piece
+                            s_stop = length_first + idx_face_strip * length_broken_line
+                    s_values_strip.append(s_stop)
+                if lane.road_mark_type == 'solid_solid':
+                    s_values.append((line_toggle_start, s_values_strip))
+                    s_values.append((line_toggle_start, s_values_strip))
+                s_values.append((line_toggle_start, s_values_strip))
+            # ASPHALT
+            if lane.side == 'left':
+                s_values.append((line_toggle_start, [0, length]))
+        return s_values
+
+    def get_strip_to_lane_mapping(self, lanes):
+        '''
+            Return list of lane indices for strip indices.
+        '''
+        strip_to_lane = []
+        strip_is_road_mark = []
+        for idx_lane, lane in enumerate(lanes):
+            if lane.side == 'left':
+                if lane.road_mark_type != 'none':
+                    if lane.road_mark_type == 'solid' or \
+                        lane.road_mark_type == 'broken':
+                        strip_to_lane.append(idx_lane)
+                        strip_is_road_mark.append(True)
+                    else:
+                        # Double line
+                        strip_to_lane.append(idx_lane)
+                        strip_to_lane.append(idx_lane)
+                        strip_to_lane.append(idx_lane)
+                        strip_is_road_mark.append(True)
+                        strip_is_road_mark.append(False)
+                        strip_is_road_mark.append(True)
+                strip_to_lane.append(idx_lane)
+                strip_is_road_mark.append(False)
+            elif lane.side == 'center':
+                if lane.road_mark_type != 'none':
+                    if lane.road_mark_type == 'solid' or \
+                        lane.road_mark_type == 'broken':
+                        strip_to_lane.append(idx_lane)
+                        strip_is_road_mark.append(True)
+                    else:
+                        # Double line
+                        strip_to_lane.append(idx_lane)
+                        strip_to_lane.append(idx_lane)
+                        strip_to_lane.append(idx_lane)
+                        strip_is_road_mark.append(True)
+                        strip_is_road_mark.append(False)
+                        strip_is_road_mark.append(True)
+            else:
+                # lane.side == 'right'
+                strip_to_lane.append(idx_lane)
+                strip_is_road_mark.append(False)
+                if lane.road_mark_type != 'none':
+                    if lane.road_mark_type == 'solid' or \
+                        lane.road_mark_type == 'broken':
+                        strip_to_lane.append(idx_lane)
+                        strip_is_road_mark.append(True)
+                    else:
+                        # Double line
+                        strip_to_lane.append(idx_lane)
+                        strip_to_lane.append(idx_lane)
+                        strip_to_lane.append(idx_lane)
+                        strip_is_road_mark.append(True)
+                        strip_is_road_mark.append(False)
+                        strip_is_road_mark.append(True)
+        return strip_to_lane, strip_is_road_mark
+
+    def get_road_mark_material(self, color):
+        '''
+            Return material name for road mark color.
+        '''
+        mapping_color_material = {
+            'white': 'road_mark_white',
+            'yellow': 'road_mark_yellow',
+        }
+        return mapping_color_material[color]
+
+    def get_face_materials(self, lanes, strips_s_boundaries):
+        '''
+            Return dictionary with index of faces for each material.
+        '''
+        materials = {'asphalt': [], 'road_mark_white': [], 'road_mark_yellow': [], 'grass': []}
+        idx_face = 0
+        strip_to_lane, strip_is_road_mark = self.get_strip_to_lane_mapping(lanes)
+        for idx_strip in range(len(strips_s_boundaries)):
+            idx_lane = strip_to_lane[idx_strip]
+            if strip_is_road_mark[idx_strip]:
+                line_toggle = strips_s_boundaries[idx_strip][0]
+                num_faces = int(len(strips_s_boundaries[idx_strip][1]) - 1)
+                material = self.get_road_mark_material(lanes[idx_lane].road_mark_color)
+                # Step through faces of a road mark strip
+                for idx in range(num_faces):
+                    # Determine material
+                    if lanes[idx_lane].road_mark_type == 'solid':
+                        materials[material].append(idx_face)
+                        idx_face += 1
+                    elif lanes[idx_lane].road_mark_type == 'broken':
+                        if line_toggle:
+                            materials[material].append(idx_face)
+                            line_toggle = False
+                        else:
+                            materials['asphalt'].append(idx_face)
+                            line_toggle = True
+                        idx_face += 1
+                    elif lanes[idx_lane].road_mark_type == 'solid_solid':
+                        materials[material].append(idx_face)
+                        idx_face += 1
+            else:
+                if lanes[idx_lane].type == 'median':
+                    materials['grass'].append(idx_face)
+                elif lanes[idx_lane].type == 'shoulder':
+                    materials['grass'].append(idx_face)
+                else:
+                    materials['asphalt'].append(idx_face)
+                idx_face += 1
+
+        return materials
+
+    def get_strips_lod(self, lanes, strips_t_profile, strips_s_boundaries, road_mark_detail):
+        '''
+            Return t profile, s boundaries and face materials of the strips
+            with reduced road mark detail. With detail 'solid' broken lines
+            are replaced by asphalt, with detail 'none' all road marks.
+            Neighbouring strips made of a single face with the same material
+            are merged by dropping the border between them.
+        '''
+        length = self.geometry.params['length']
+        num_faces = sum(len(s_boundaries) - 1 for _, s_boundaries in strips_s_boundaries)
+        faces_material = [None] * num_faces
+        for material, idx_faces in self.get_face_materials(lanes, strips_s_boundaries).items():
+            for idx_face in idx_faces:
+                faces_material[idx_face] = material
+        strip_to_lane, strip_is_road_mark = self.get_strip_to_lane_mapping(lanes)
+        idx_borders = [0]
+        lod_s_boundaries = []
+        lod_faces_material = []
+        idx_face = 0
+        for idx_strip, (line_toggle, s_boundaries) in enumerate(strips_s_boundaries):
+            strip_faces_material = faces_material[idx_face:idx_face + len(s_boundaries) - 1]
+            idx_face += len(s_boundaries) - 1
+            road_mark_type = lanes[strip_to_lane[idx_strip]].road_mark_type
+            if strip_is_road_mark[idx_strip] and \
+                    (road_mark_detail == 'none' or road_mark_type == 'broken'):
+                s_boundaries = [0, length]
+                strip_faces_material = ['asphalt']
+            if len(s_boundaries) == 2 and len(lod_s_boundaries) > 0 \
+                    and len(lod_s_boundaries[-1][1]) == 2 \
+                    and lod_faces_material[-1] == strip_faces_material[0]:
+                # Extend previous strip to the right border of this strip
+                idx_borders[-1] = idx_strip + 1
+            else:
+                idx_borders.append(idx_strip + 1)
+                lod_s_boundaries.append((line_toggle, s_boundaries))
+                lod_faces_material.extend(strip_faces_material)
+        lod_face_materials = {'asphalt': [], 'road_mark_white': [], 'road_mark_yellow': [], 'grass': []}
+        for idx_face, material in enumerate(lod_faces_material):
+            lod_face_materials[material].append(idx_face)
+        t_offsets, t_cubics = strips_t_profile
+        return (t_offsets[idx_borders], t_cubics[idx_borders]), lod_s_boundaries, lod_face_materials
+
+    def get_road_sample_density(self, strips_t_profile):
+        '''
+            Return a grid of s values and the sample density in each grid
+            cell for a maximum mesh deviation of 1 m. The sample density for
+            other maximum deviations scales with one over their square root.
+            The local curvature takes into account the plan view, the
+            elevation and the opening and closing of lanes.
+        '''
+        length = self.geometry.params['length']
+        # Plan view curvature of clothoids as well as the second derivative of
+        # the elevation and lane width polynomials are linear in s between the
+        # segment breakpoints. Hence, the curvature inside of each grid cell
+        # is bounded by its values at the ends of the cell. Geometries with
+        # non-linear curvature add the s values of its extrema to the
+        # breakpoints, so it is monotonic inside of each cell.
+        s_elevation, _ = self.geometry.get_elevation_profile()
+        s_breakpoints = np.concatenate((s_elevation, self.geometry.get_plan_view_breakpoints()))
+        s_grid = np.union1d(np.linspace(0, length, min(1000, ceil(length / 10)) + 1),
+            s_breakpoints[(s_breakpoints > 0) & (s_breakpoints < length)])
+        s_ends = np.stack((s_grid[:-1], np.nextafter(s_grid[1:], 0)))
+        # The plan view curvature is largest on the outermost border
+        t_offsets, t_cubics = strips_t_profile
+        t_abs_max = max(np.max(np.abs(t_offsets)), np.max(np.abs(t_offsets + t_cubics)))
+        curvature_plan_view = np.abs(self.geometry.get_curvature_plan_view(s_ends))
+        curvature_plan_view *= 1 + curvature_plan_view * t_abs_max
+        curvature_elevation = np.abs(self.geometry.get_curvature_elevation_batch(s_ends))
+        # Second derivative of the lane width term 3 * s_norm**2 - 2 * s_norm**3
+        s_norm = s_ends / length
+        curvature_lanes = np.max(np.abs(t_cubics)) * np.abs(6.0 - 12.0 * s_norm) / length**2
+        # Lane width changes bend the borders in the same plane as the plan
+        # view curvature, the elevation bends them orthogonal to it
+        curvature = np.max(np.hypot(curvature_plan_view + curvature_lanes, curvature_elevation), axis=0)
+        # The sagitta of a chord with length h is curvature * h**2 / 8
+        return s_grid, np.sqrt(curvature / 8.0)
+
+    def get_road_s_samples(self, sample_density, max_deviation):
+        '''
+            Return array of s values where the road is sampled. The samples
+            are distributed such that the chordal deviation of the mesh from
+            the road borders stays below the maximum deviation, but not closer
+            than the minimum sample distance.
+        '''
+        length = self.geometry.params['length']
+        s_grid, density = sample_density
+        density = np.minimum(density / np.sqrt(max_deviation), 1.0 / self.length_sample_min)
+        # Place one sample per unit of the integrated sample density
+        num_samples_cumulative = np.concatenate(([0.0], np.cumsum(density * np.diff(s_grid))))
+        num_steps = max(1, ceil(num_samples_cumulative[-1]))
+        samples = np.arange(1, num_steps) * (num_samples_cumulative[-1] / num_steps)
+        idx_cell = np.searchsorted(num_samples_cumulative, samples, side='right') - 1
+        s_samples = s_grid[idx_cell] + (samples - num_samples_cumulative[idx_cell]) / density[idx_cell]
+        return np.concatenate(([0.0], s_samples, [length]))
+
+    def get_road_sample_points(self, strips_t_profile, strips_s_boundaries, s_samples):
+        '''
+            Sample road along all strip borders. Each border is sampled at the
+            given s samples and at the face boundaries of the strips left
+            and right of it, so neighbouring faces can share their vertices.
+            Return a list with the s values and a list with the sample points
+            of each border.
+        '''
+        # Make sure the road has a non-zero length
+        if self.geometry.params['length'] == 0:
+            return [], []
+        # Face boundaries inside of each strip, excluding road start and end
+        strips_s_inner = [np.array(s_boundaries[1][1:-1], dtype=np.float64)
+            for s_boundaries in strips_s_boundaries]
+        num_borders = len(strips_t_profile[0])
+        borders_s = []
+        for idx_border in range(num_borders):
+            s_border = [s_samples]
+            if idx_border > 0:
+                s_border.append(strips_s_inner[idx_border - 1])
+            if idx_border < num_borders - 1:
+                s_border.append(strips_s_inner[idx_border])
+            borders_s.append(np.unique(np.concatenate(s_border)))
+        # Sample all cross sections in one go
+        s_all = np.unique(np.concatenate(borders_s))
+        t_all = self.get_strips_t_values(strips_t_profile, s_all)
+        xyz_all, _ = self.geometry.sample_cross_section_batch(s_all, t_all)
+        borders_xyz = [xyz_all[np.searchsorted(s_all, s_border), idx_border]
+            for idx_border, s_border in enumerate(borders_s)]
+        return borders_s, borders_xyz
+
+    def get_road_vertices_edges_faces(self, strips_s_boundaries, borders_s, borders_xyz):
+        '''
+            Generate flat mesh arrays from the sample points of the strip
+            borders. Neighbouring strips share the vertices of their common
+            border. Each strip is meshed with quads between consecutive
+            samples and triangles where only one border has a sample. Return
+            the vertices, the outline edges of the faces, the vertex index of
+            each polygon loop, the number of loops of each polygon and the
+            index of the face (as counted by get_face_materials) each polygon
+            belongs to.
+        '''
+        if not borders_xyz:
+            return np.zeros((0, 3)), np.zeros((0, 2), dtype=np.int32), np.zeros(0, dtype=np.int32), \
+                np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+        vertices = np.concatenate(borders_xyz)
+        borders_offset = np.cumsum([0] + [len(s_border) for s_border in borders_s[:-1]])
+        # Edges along the borders
+        idx_vertex_border_end = borders_offset + [len(s_border) - 1 for s_border in borders_s]
+        idx_vertex = np.setdiff1d(np.arange(len(vertices)), idx_vertex_border_end)
+        edges = [np.stack((idx_vertex, idx_vertex + 1), axis=1)]
+        loops_vertex_index = []
+        polygons_loop_total = []
+        polygons_face = []
+        num_faces = 0
+        for idx_strip in range(len(borders_s) - 1):
+            s_left = borders_s[idx_strip]
+            s_right = borders_s[idx_strip + 1]
+            s_boundaries = np.array(strips_s_boundaries[idx_strip][1], dtype=np.float64)
+            # Edges across the strip at the face boundaries
+            edges.append(np.stack((
+                borders_offset[idx_strip] + np.searchsorted(s_left, s_boundaries),
+                borders_offset[idx_strip + 1] + np.searchsorted(s_right, s_boundaries)), axis=1))
+            # Step from sample to sample along the strip and advance on the
+            # left, the right or both borders
+            s_steps = np.union1d(s_left, s_right)
+            s_step_start = s_steps[:-1]
+            s_step_end = s_steps[1:]
+            idx_left = borders_offset[idx_strip] \
+                + np.searchsorted(s_left, s_step_start, side='right') - 1
+            idx_right = borders_offset[idx_strip + 1] \
+                + np.searchsorted(s_right, s_step_start, side='right') - 1
+            advance_left = np.isin(s_step_end, s_left)
+            advance_right = np.isin(s_step_end, s_right)
+            # Quad if both borders advance, otherwise a triangle
+            polygons = np.stack((idx_right, idx_right + 1, idx_left + 1, idx_left), axis=1)
+            polygons_mask = np.stack((np.ones(len(s_step_start), dtype=bool), advance_right,
+                advance_left, np.ones(len(s_step_start), dtype=bool)), axis=1)
+            loops_vertex_index.append(polygons[polygons_mask])
+            polygons_loop_total.append(np.count_nonzero(polygons_mask, axis=1))
+            polygons_face.append(num_faces + np.searchsorted(s_boundaries, s_step_start, side='right') - 1)
+            num_faces += len(s_boundaries) - 1
+        loops_vertex_index = np.concatenate(loops_vertex_index).astype(np.int32)
+        polygons_loop_total = np.concatenate(polygons_loop_total).astype(np.int32)
+        polygons_face = np.concatenate(polygons_face)
+        edges = np.concatenate(edges)
+        return self.merge_zero_width_samples(borders_s, borders_offset, vertices, edges,
+            loops_vertex_index, polygons_loop_total, polygons_face)
+
+    def merge_zero_width_samples(self, borders_s, borders_offset, vertices, edges,
+                                 loops_vertex_index, polygons_loop_total, polygons_face):
+        '''
+            Merge the samples of neighbouring borders which coincide, e.g. at
+            the start of an opening lane or the end of a closing lane. Drop
+            the polygons and edges which collapse and return the updated
+            mesh arrays.
+        '''
+        # Map every vertex to the vertex it is merged into, borders are
+        # processed left to right so chains of coincident borders resolve to
+        # the leftmost border
+        vertex_map = np.arange(len(vertices))
+        for idx_border in range(len(borders_s) - 1):
+            s_common, idx_left, idx_right = np.intersect1d(borders_s[idx_border],
+                borders_s[idx_border + 1], assume_unique=True, return_indices=True)
+            idx_left += borders_offset[idx_border]
+            idx_right += borders_offset[idx_border + 1]
+            coincident = np.linalg.norm(vertices[idx_left] - vertices[idx_right], axis=1) \
+                < self.distance_merge
+            vertex_map[idx_right[coincident]] = vertex_map[idx_left[coincident]]
+        if np.all(vertex_map == np.arange(len(vertices))):
+            return vertices, edges, loops_vertex_index, polygons_loop_total, polygons_face
+        # Remove merged vertices and renumber the remaining ones
+        vertex_keep = vertex_map == np.arange(len(vertices))
+        vertex_map = (np.cumsum(vertex_keep) - 1)[vertex_map]
+        vertices = vertices[vertex_keep]
+        # Drop loops repeating the vertex of the next loop of their polygon,
+        # quads become triangles and triangles collapse
+        loops_vertex_index = vertex_map[loops_vertex_index].astype(np.int32)
+        polygons_loop_start = np.cumsum(polygons_loop_total) - polygons_loop_total
+        loops_next = np.arange(1, len(loops_vertex_index) + 1)
+        loops_next[polygons_loop_start + polygons_loop_total - 1] = polygons_loop_start
+        loops_keep = loops_vertex_index != loops_vertex_index[loops_next]
+        polygons_loop_total_merged = np.add.reduceat(loops_keep, polygons_loop_start)
+        polygons_keep = polygons_loop_total_merged >= 3
+        loops_keep &= np.repeat(polygons_keep, polygons_loop_total)
+        loops_vertex_index = loops_vertex_index[loops_keep]
+        polygons_loop_total = polygons_loop_total_merged[polygons_keep].astype(np.int32)
+        polygons_face = polygons_face[polygons_keep]
+        # Drop collapsed and duplicated edges
+        edges = np.sort(vertex_map[edges], axis=1)
+        edges = np.unique(edges[edges[:, 0] != edges[:, 1]], axis=0)
+        return vertices, edges, loops_vertex_index, polygons_loop_total, polygons_face
+
+    def get_road_mesh_arrays(self, strips_t_profile, strips_s_boundaries, face_materials, s_samples):
+        '''
+            Return the flat mesh arrays of the road sampled at the given s
+            values and a dictionary with the polygon indices of each
+            material.
+        '''
+        borders_s, borders_xyz = self.get_road_sample_points(strips_t_profile,
+            strips_s_boundaries, s_samples)
+        vertices, edges, loops_vertex_index, polygons_loop_total, polygons_face = \
+            self.get_road_vertices_edges_faces(strips_s_boundaries, borders_s, borders_xyz)
+        # Map materials from faces to the polygons they are made of
+        materials = {material: np.flatnonzero(np.isin(polygons_face, idx_faces))
+            for material, idx_faces in face_materials.items()}
+        return vertices, edges, loops_vertex_index, polygons_loop_total, materials
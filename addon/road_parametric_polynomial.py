@@ -11,20 +11,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
-import bpy
 
+from . road_base import DSC_OT_road
+from . geometry_parametric_polynomial import DSC_geometry_parametric_polynomial
 
-class DSC_OT_road_parametric_polynomial(bpy.types.Operator):
+
+class DSC_OT_road_parametric_polynomial(DSC_OT_road):
     bl_idname = "dsc.road_parametric_polynomial"
     bl_label = "Parametric polynomial"
     bl_description = "Create a cubic parametric polynomial road"
     bl_options = {'REGISTER', 'UNDO'}
 
-    @classmethod
-    def poll(cls, context):
-        return False
-
-    def execute(self, context):
-        self.report({'INFO'}, "Not implemented.")
+    object_type = 'road_parametric_polynomial'
+    snap_filter = 'OpenDRIVE'
 
-        return {'FINISHED'}
\ No newline at end of file
+    geometry = DSC_geometry_parametric_polynomial()
@@ -186,6 +186,12 @@ class DSC_road_properties(bpy.types.PropertyGroup):
     width_none: bpy.props.FloatProperty(default=2.5, min=0.01, max=10.0, step=1)
 
     design_speed: bpy.props.FloatProperty(default=130.0, min=1.00, max=400.0, step=1)
+    # Maximum deviation of the road mesh from the exact road geometry in meters
+    mesh_max_deviation: bpy.props.FloatProperty(default=0.01, min=0.001, max=1.0, step=1, precision=3)
+    # Number of additional road meshes with reduced level of detail and the
+    # factor by which the maximum deviation grows from level to level
+    mesh_lod_num: bpy.props.IntProperty(default=2, min=0, max=4)
+    mesh_lod_factor: bpy.props.FloatProperty(default=10.0, min=2.0, max=100.0, step=100)
 
     num_lanes_left: bpy.props.IntProperty(default=2, min=0, max=20, update=callback_num_lanes)
     num_lanes_right: bpy.props.IntProperty(default=2, min=0, max=20, update=callback_num_lanes)
@@ -13,6 +13,7 @@
 
 from . road_base import DSC_OT_road
 from . geometry_line import DSC_geometry_line
+from . geometry_plan_view import DSC_geometry_plan_view
 
 
 class DSC_OT_road_straight(DSC_OT_road):
@@ -23,5 +24,5 @@ class DSC_OT_road_straight(DSC_OT_road):
 
     object_type = 'road_straight'
 
-    geometry = DSC_geometry_line()
+    geometry = DSC_geometry_plan_view(DSC_geometry_line())
     params = {}
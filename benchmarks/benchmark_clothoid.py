@@ -0,0 +1,104 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+    Benchmark of the vectorized clothoid evaluation (Spiral) against sample by
+    sample evaluation with pyclothoids on long spirals. Reports the time of
+    both and the largest position and heading difference. Exits with code 1
+    if the position differs by more than the tolerance. Run it with any Python
+    3 interpreter which has the add-on requirements installed:
+
+        python3 benchmarks/benchmark_clothoid.py
+'''
+
+import argparse
+import pathlib
+import sys
+import time
+import types
+
+# Import the add-on modules as package without running the add-on
+# registration, which needs Blender
+addon_dir = pathlib.Path(__file__).resolve().parent.parent / 'addon'
+package = types.ModuleType('dsc')
+package.__path__ = [str(addon_dir)]
+sys.modules['dsc'] = package
+
+from dsc.geometry_clothoid import Spiral
+
+from pyclothoids import Clothoid
+
+import numpy as np
+
+# End point x, y and end heading of the spirals (G1 Hermite solution from the
+# origin with heading 0)
+spirals = {
+    'long_flat_9km': (9000.0, 10.0, 0.01),
+    'long_5km': (4500.0, 1000.0, 0.6),
+    'long_2km_turning': (1500.0, 1200.0, 2.5),
+    'medium_500m': (450.0, 100.0, 0.6),
+    'hairpin_200m': (20.0, 120.0, 3.0),
+    'loop_300m': (200.0, 200.0, 6.0),
+}
+
+nums_samples = [1000, 10000, 100000]
+
+
+def evaluate_pyclothoids(clothoid, s):
+    '''
+        Evaluate pyclothoids sample by sample.
+    '''
+    x = np.fromiter((clothoid.X(s_i) for s_i in s.tolist()), dtype=np.float64, count=s.size)
+    y = np.fromiter((clothoid.Y(s_i) for s_i in s.tolist()), dtype=np.float64, count=s.size)
+    hdg = np.fromiter((clothoid.Theta(s_i) for s_i in s.tolist()), dtype=np.float64, count=s.size)
+    return x, y, hdg
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the vectorized clothoid evaluation against pyclothoids.')
+    parser.add_argument('--tolerance', type=float, default=1e-9,
+        help='maximum allowed position difference in m (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3,
+        help='number of repetitions of each case, the best time counts (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    print('{:<20} {:>10} {:>10} {:>14} {:>14} {:>8} {:>12} {:>12}'.format('spiral', 'length',
+        'samples', 'pyclothoids', 'Spiral', 'speedup', 'max dist', 'max dhdg'))
+    error_max = 0.0
+    for name, (x_end, y_end, hdg_end) in spirals.items():
+        clothoid = Clothoid.G1Hermite(0.0, 0.0, 0.0, x_end, y_end, hdg_end)
+        for num_samples in nums_samples:
+            s = np.linspace(0.0, clothoid.length, num_samples)
+            time_reference = float('inf')
+            time_spiral = float('inf')
+            for _ in range(max(1, args.repeat)):
+                time_start = time.perf_counter()
+                x_ref, y_ref, hdg_ref = evaluate_pyclothoids(clothoid, s)
+                time_reference = min(time_reference, time.perf_counter() - time_start)
+                time_start = time.perf_counter()
+                spiral = Spiral(clothoid.KappaStart, clothoid.dk, clothoid.length)
+                x, y, hdg, curvature = spiral.evaluate(s)
+                time_spiral = min(time_spiral, time.perf_counter() - time_start)
+            distance_max = np.max(np.hypot(x - x_ref, y - y_ref))
+            error_max = max(error_max, distance_max)
+            print('{:<20} {:>10.1f} {:>10} {:>11.2f} ms {:>11.2f} ms {:>7.1f}x {:>12.2e} {:>12.2e}'.format(
+                name, clothoid.length, num_samples, 1000 * time_reference, 1000 * time_spiral,
+                time_reference / time_spiral, distance_max, np.max(np.abs(hdg - hdg_ref))))
+    if error_max > args.tolerance:
+        print('Largest position difference {:.2e} m exceeds tolerance {:.2e} m'.format(
+            error_max, args.tolerance))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,357 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+'''
+    Benchmark of the parts of the driving scenario export which do not need
+    Blender. The export operator is run with minimal stand-ins for the
+    Blender Python modules and with OpenDRIVE objects held in plain Python
+    objects instead of a Blender collection. Run it with any Python 3
+    interpreter which has the add-on requirements installed:
+
+        python3 benchmarks/benchmark_export.py
+
+    The roads case exports chains of linked roads of growing size to
+    OpenDRIVE and reports the time per road, which should stay constant.
+    The vehicles case exports growing numbers of cars to the vehicle catalog
+    and the OpenSCENARIO file and reports the time per vehicle, which should
+    stay constant as well. The osgconv case converts .obj files with osgconv replaced by a stub
+    which takes a fixed time and fails for selected files. It checks that
+    identical files are converted once, that conversions run in parallel and
+    that the .obj and .mtl files of failed conversions are kept. Exits with
+    code 1 if the time per road or vehicle of the largest case exceeds the
+    one of the smallest case by more than the tolerance factor or if a check
+    of the osgconv case fails.
+'''
+
+import argparse
+import contextlib
+import io
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+from unittest import mock
+
+
+class StandIn():
+    '''
+        Stand-in for Blender modules and data which returns another stand-in
+        for any attribute access or call.
+    '''
+    def __getattr__(self, name):
+        return StandIn()
+
+    def __call__(self, *args, **kwargs):
+        return StandIn()
+
+
+def install_blender_stand_ins():
+    '''
+        Register stand-ins for the Blender modules imported by the export and
+        helpers modules. Blender data is accessed through bpy.data, which the
+        cases fill with their collections.
+    '''
+    bpy = types.ModuleType('bpy')
+    bpy.types = types.SimpleNamespace(Operator=object)
+    bpy.props = StandIn()
+    bpy.ops = StandIn()
+    bpy.utils = StandIn()
+    bpy.context = StandIn()
+    bpy.app = types.SimpleNamespace(version=(3, 3, 0), version_string='3.3.0')
+    bpy.data = types.SimpleNamespace(collections={})
+    view3d_utils = types.ModuleType('bpy_extras.view3d_utils')
+    view3d_utils.region_2d_to_origin_3d = StandIn()
+    view3d_utils.region_2d_to_vector_3d = StandIn()
+    bpy_extras = types.ModuleType('bpy_extras')
+    bpy_extras.view3d_utils = view3d_utils
+    sys.modules['bpy'] = bpy
+    sys.modules['bpy_extras'] = bpy_extras
+    sys.modules['bpy_extras.view3d_utils'] = view3d_utils
+    sys.modules['bmesh'] = types.ModuleType('bmesh')
+    sys.modules['addon_utils'] = types.ModuleType('addon_utils')
+    return bpy
+
+bpy = install_blender_stand_ins()
+
+# Import the add-on modules as package without running the add-on
+# registration, which needs Blender
+addon_dir = pathlib.Path(__file__).resolve().parent.parent / 'addon'
+package = types.ModuleType('dsc')
+package.__path__ = [str(addon_dir)]
+sys.modules['dsc'] = package
+
+from dsc.export import DSC_OT_export
+from dsc.export_statistics import DSC_export_statistics
+
+nums_roads = [250, 500, 1000, 2000]
+
+nums_vehicles = [125, 250, 500, 1000]
+
+# Number of .obj files, number of different files among them, number of
+# different files failing to convert
+cases_osgconv = {
+    'all_converted': (16, 4, 0),
+    'one_failing': (16, 4, 1),
+}
+
+# Time a single stubbed osgconv call takes
+time_osgconv = 0.2
+
+
+class Object(dict):
+    '''
+        Blender object with custom properties.
+    '''
+    def __init__(self, name, **properties):
+        super().__init__(properties)
+        self.name = name
+
+
+class Mesh():
+    '''
+        Blender mesh with empty attribute arrays.
+    '''
+    def __init__(self):
+        self.vertices = self.loops = self.polygons = self
+        self.materials = []
+
+    def __len__(self):
+        return 0
+
+    def foreach_get(self, attribute, data):
+        pass
+
+
+class Vehicle(Object):
+    '''
+        Blender object of a dynamic OpenSCENARIO object.
+    '''
+    def __init__(self, name, **properties):
+        super().__init__(name, **properties)
+        self.data = Mesh()
+        self.scale = (1.0, 1.0, 1.0)
+        self.modifiers = []
+
+    def copy(self):
+        return Vehicle(self.name + '.001', **self)
+
+    def select_set(self, state):
+        pass
+
+
+class Collection():
+    '''
+        Blender collection with objects and child collections.
+    '''
+    def __init__(self, objects, children={}):
+        self.objects = objects
+        self.children = children
+
+
+class DSC_OT_export_benchmark(DSC_OT_export):
+    '''
+        Export operator collecting its reports instead of showing them.
+    '''
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self.mesh_file_type = 'osgb'
+        self.incremental_opendrive = False
+        self.export_lods = False
+        self.trace_memory = False
+        self.osgb_conversions = []
+        self.reports = []
+        self.statistics = DSC_export_statistics()
+
+    def report(self, type, message):
+        self.reports.append((type.pop(), message))
+
+    def get_model_cache_dir(self):
+        model_cache_dir = pathlib.Path(self.directory) / 'model_cache'
+        model_cache_dir.mkdir(parents=True, exist_ok=True)
+        return model_cache_dir
+
+
+def get_road(id_odr, x, id_predecessor, id_successor, num_lanes=2):
+    '''
+        Return a straight road object with lanes on both sides linked to its
+        predecessor and successor.
+    '''
+    obj = Object('road_straight_' + str(id_odr), id_odr=id_odr, road_split_type='none',
+        geometry={'curve': 'line', 'point_start': [x, 0.0, 0.0], 'heading_start': 0.0,
+                  'length': 100.0, 'curvature_start': 0.0, 'curvature_end': 0.0,
+                  'elevation': [{'s': 0, 'a': 0, 'b': 0, 'c': 0, 'd': 0}]},
+        lane_center_road_mark_type='solid', lane_center_road_mark_weight='standard',
+        lane_center_road_mark_color='white')
+    for side in ['left', 'right']:
+        obj['lanes_' + side + '_num'] = num_lanes
+        obj['lanes_' + side + '_types'] = ['driving'] * num_lanes
+        obj['lanes_' + side + '_widths'] = [3.5] * num_lanes
+        obj['lanes_' + side + '_widths_change'] = ['none'] * num_lanes
+        obj['lanes_' + side + '_road_mark_types'] = ['solid'] * num_lanes
+        obj['lanes_' + side + '_road_mark_weights'] = ['standard'] * num_lanes
+        obj['lanes_' + side + '_road_mark_colors'] = ['white'] * num_lanes
+    if id_predecessor is not None:
+        obj['link_predecessor_id_l'] = id_predecessor
+        obj['link_predecessor_cp_l'] = 'cp_end_l'
+    if id_successor is not None:
+        obj['link_successor_id_l'] = id_successor
+        obj['link_successor_cp_l'] = 'cp_start_l'
+    return obj
+
+def run_roads(num_roads, directory):
+    '''
+        Export a chain of linked roads to OpenDRIVE and return the time.
+    '''
+    objects = [get_road(idx, 100.0 * idx, idx - 1 if idx > 0 else None,
+        idx + 1 if idx < num_roads - 1 else None) for idx in range(num_roads)]
+    bpy.data.collections = {'OpenDRIVE': Collection(objects)}
+    operator = DSC_OT_export_benchmark(directory)
+    operator.statistics.start()
+    time_start = time.perf_counter()
+    operator.export_opendrive(pathlib.Path(directory) / 'bdsc_export.xodr')
+    time_export = time.perf_counter() - time_start
+    operator.statistics.stop()
+    return time_export
+
+def run_vehicles(num_vehicles, directory):
+    '''
+        Export cars sharing one model to the vehicle catalog and the
+        OpenSCENARIO file, return the time and the number of cars in the
+        catalog.
+    '''
+    objects = [Vehicle('car_' + str(idx), dsc_type='car', position=[10.0 * idx, 0.0, 0.0],
+        hdg=0.0, speed_initial=50.0) for idx in range(num_vehicles)]
+    # Like in Blender child collections are also listed at the top level
+    dynamic_objects = Collection(objects)
+    bpy.data.collections = {'OpenSCENARIO': Collection([], children={'dynamic_objects': dynamic_objects}),
+        'dynamic_objects': dynamic_objects}
+    operator = DSC_OT_export_benchmark(directory)
+    operator.statistics.start()
+    time_start = time.perf_counter()
+    # The temporary copy of the exported model is not linked to a collection
+    with mock.patch('dsc.helpers.link_object_openscenario'):
+        operator.export_vehicle_models(bpy.context)
+    operator.export_openscenario()
+    time_export = time.perf_counter() - time_start
+    operator.statistics.stop()
+    catalog_path = pathlib.Path(directory) / 'catalogs' / 'vehicles' / 'VehicleCatalog.xosc'
+    return time_export, catalog_path.read_text().count('<Vehicle ')
+
+def run_osgconv(num_files, num_unique, num_failing, directory):
+    '''
+        Convert .obj files of which only some are different with a stubbed
+        osgconv. Return the operator, the paths of the .obj files, the number
+        of osgconv calls and the time.
+    '''
+    operator = DSC_OT_export_benchmark(directory)
+    operator.num_workers_osgconv = num_unique
+    file_paths_obj = []
+    for idx in range(num_files):
+        file_path_obj = pathlib.Path(directory) / 'models' / ('model_' + str(idx) + '.obj')
+        file_path_obj.parent.mkdir(parents=True, exist_ok=True)
+        file_path_obj.write_text('o model_{}\nv {} 0 0\n'.format(idx, idx % num_unique))
+        file_path_obj.with_suffix('.mtl').write_text('newmtl road\n')
+        file_paths_obj.append(file_path_obj)
+    operator.osgb_conversions = list(file_paths_obj)
+    calls = []
+    def osgconv(command, **kwargs):
+        calls.append(command)
+        time.sleep(time_osgconv)
+        if int(pathlib.Path(command[1]).stem.split('_')[-1]) % num_unique < num_failing:
+            return subprocess.CompletedProcess(command, 1)
+        pathlib.Path(command[2]).write_bytes(pathlib.Path(command[1]).read_bytes())
+        return subprocess.CompletedProcess(command, 0)
+    operator.statistics.start()
+    time_start = time.perf_counter()
+    with mock.patch('dsc.export.subprocess.run', osgconv):
+        operator.convert_all_to_osgb()
+    time_conversion = time.perf_counter() - time_start
+    operator.statistics.stop()
+    return operator, file_paths_obj, len(calls), time_conversion
+
+def check_osgconv(name, num_files, num_unique, num_failing, directory):
+    '''
+        Run an osgconv case and return the messages of all failed checks.
+    '''
+    operator, file_paths_obj, num_calls, time_conversion = \
+        run_osgconv(num_files, num_unique, num_failing, directory)
+    print('{:<16} {:>6} {:>12} {:>10.2f}'.format(name, num_files, num_calls, time_conversion))
+    messages = []
+    if num_calls != num_unique:
+        messages.append('{}: {} osgconv calls for {} different files'.format(name, num_calls, num_unique))
+    if time_conversion > 2 * time_osgconv:
+        messages.append('{}: conversion took {:.2f} s, not run in parallel'.format(name, time_conversion))
+    for idx, file_path_obj in enumerate(file_paths_obj):
+        failing = idx % num_unique < num_failing
+        if file_path_obj.with_suffix('.osgb').exists() == failing:
+            messages.append('{}: .osgb file of {} {}'.format(name, file_path_obj.name,
+                'written for failed conversion' if failing else 'missing'))
+        if file_path_obj.exists() != failing or file_path_obj.with_suffix('.mtl').exists() != failing:
+            messages.append('{}: .obj and .mtl files of {} {}'.format(name, file_path_obj.name,
+                'removed after failed conversion' if failing else 'not removed'))
+    if (operator.statistics.counts.get('errors', 0) > 0) != (num_failing > 0):
+        messages.append('{}: failed conversion {}'.format(name,
+            'not reported' if num_failing > 0 else 'reported without failure'))
+    return messages
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the parts of the export which do not need Blender.')
+    parser.add_argument('--tolerance', type=float, default=2.0,
+        help='factor by which the time per road or vehicle may grow with their number (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    messages = []
+    with tempfile.TemporaryDirectory() as directory:
+        print('{:<10} {:>10} {:>14}'.format('roads', 'time [s]', 'per road [ms]'))
+        times_per_road = []
+        for num_roads in nums_roads:
+            with contextlib.redirect_stdout(io.StringIO()):
+                time_export = run_roads(num_roads, directory)
+            times_per_road.append(time_export / num_roads)
+            print('{:<10} {:>10.2f} {:>14.3f}'.format(num_roads, time_export, 1000 * times_per_road[-1]))
+        if times_per_road[-1] > args.tolerance * times_per_road[0]:
+            messages.append('roads: time per road grows from {:.3f} ms to {:.3f} ms'.format(
+                1000 * times_per_road[0], 1000 * times_per_road[-1]))
+
+    print()
+    with tempfile.TemporaryDirectory() as directory:
+        print('{:<10} {:>10} {:>16}'.format('vehicles', 'time [s]', 'per vehicle [ms]'))
+        times_per_vehicle = []
+        for num_vehicles in nums_vehicles:
+            with contextlib.redirect_stdout(io.StringIO()):
+                time_export, num_catalog = run_vehicles(num_vehicles, directory)
+            times_per_vehicle.append(time_export / num_vehicles)
+            print('{:<10} {:>10.2f} {:>16.3f}'.format(num_vehicles, time_export, 1000 * times_per_vehicle[-1]))
+            if num_catalog != num_vehicles:
+                messages.append('vehicles: {} of {} vehicles in the catalog'.format(num_catalog, num_vehicles))
+        if times_per_vehicle[-1] > args.tolerance * times_per_vehicle[0]:
+            messages.append('vehicles: time per vehicle grows from {:.3f} ms to {:.3f} ms'.format(
+                1000 * times_per_vehicle[0], 1000 * times_per_vehicle[-1]))
+
+    print()
+    print('{:<16} {:>6} {:>12} {:>10}'.format('osgconv', 'files', 'conversions', 'time [s]'))
+    for name, (num_files, num_unique, num_failing) in cases_osgconv.items():
+        with tempfile.TemporaryDirectory() as directory:
+            messages += check_osgconv(name, num_files, num_unique, num_failing, directory)
+
+    for message in messages:
+        print('REGRESSION', message)
+    return 1 if len(messages) > 0 else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,225 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+    Benchmark of the road meshing over all cross section presets and road mark
+    variants for lines, arcs and clothoids of different lengths. The road
+    meshing does not need Blender, run it with any Python 3 interpreter which
+    has the add-on requirements (NumPy, mathutils, pyclothoids) installed:
+
+        python3 benchmarks/benchmark_road_mesh.py
+
+    Time, number of vertices and number of faces of each case are compared to
+    the baseline file. Slowdowns of the total time or of single cases beyond
+    their tolerance and changed mesh sizes are reported and make the script
+    exit with code 1. Timings depend on the
+    machine, create a baseline on the machine used for comparison with
+
+        python3 benchmarks/benchmark_road_mesh.py --write-baseline
+'''
+
+import argparse
+import json
+import pathlib
+import sys
+import time
+import types
+
+from math import cos, pi, sin
+
+# Import the add-on modules as package without running the add-on
+# registration, which needs Blender
+addon_dir = pathlib.Path(__file__).resolve().parent.parent / 'addon'
+package = types.ModuleType('dsc')
+package.__path__ = [str(addon_dir)]
+sys.modules['dsc'] = package
+
+from dsc.geometry_arc import DSC_geometry_arc
+from dsc.geometry_clothoid import DSC_geometry_clothoid
+from dsc.geometry_line import DSC_geometry_line
+from dsc.geometry_parametric_polynomial import DSC_geometry_parametric_polynomial
+from dsc.params_cross_section import params_cross_section
+from dsc.road_mesh import road_mesh, get_lanes_cross_section
+
+from mathutils import Vector
+
+baseline_default = pathlib.Path(__file__).resolve().parent / 'baseline_road_mesh.json'
+
+geometries = {
+    'line': DSC_geometry_line,
+    'arc': DSC_geometry_arc,
+    'clothoid': DSC_geometry_clothoid,
+    'parampoly3': DSC_geometry_parametric_polynomial,
+}
+
+lengths = [50.0, 500.0, 5000.0]
+
+# Road mark types selectable in the road properties
+road_mark_types = ['none', 'solid', 'broken', 'solid_solid']
+
+
+def get_params_input(curve, length):
+    '''
+        Return the input parameters of a road with the given curve type and
+        (approximate for clothoids and parametric polynomials) length. Both
+        road ends are connected, so the road gets a cubic elevation profile.
+    '''
+    if curve == 'line':
+        point_end = Vector((length, 0.0, 0.0))
+        heading_end = 0.0
+    elif curve == 'arc':
+        # Arc of 60 degrees
+        angle = pi / 3
+        radius = length / angle
+        point_end = Vector((radius * sin(angle), radius * (1 - cos(angle)), 0.0))
+        heading_end = angle
+    else:
+        point_end = Vector((0.9 * length, 0.2 * length, 0.0))
+        heading_end = 0.6
+    point_end.z = length / 100
+    return {
+        'point_start': Vector((0.0, 0.0, 0.0)),
+        'point_end': point_end,
+        'heading_start': 0.0,
+        'heading_end': heading_end,
+        'curvature_start': 0.0,
+        'curvature_end': 0.0,
+        'slope_start': 0.0,
+        'slope_end': 0.0,
+        'connected_start': True,
+        'connected_end': True,
+        'normal_start': Vector((0.0, 0.0, 1.0)),
+        'design_speed': 130.0,
+    }
+
+def get_cases():
+    '''
+        Return list of benchmark cases as tuples of name, curve type, length
+        and lanes.
+    '''
+    cases = []
+    cross_sections = [(name, get_lanes_cross_section(name)) for name in params_cross_section]
+    # Replace all road marks of the default cross section with each road mark type
+    for road_mark_type in road_mark_types:
+        lanes = get_lanes_cross_section('two_lanes_default')
+        for lane in lanes:
+            if lane.road_mark_width > 0:
+                lane.road_mark_type = road_mark_type
+        cross_sections.append(('road_mark_' + road_mark_type, lanes))
+    for cross_section, lanes in cross_sections:
+        for curve in geometries:
+            for length in lengths:
+                name = '{}_{}_{:g}m'.format(cross_section, curve, length)
+                cases.append((name, curve, length, lanes))
+    return cases
+
+def run_case(curve, length, lanes, length_broken_line, max_deviation, repeat):
+    '''
+        Run the geometry update and road meshing of a case and return the
+        best time of all repetitions, the number of vertices and the number
+        of faces.
+    '''
+    params_input = get_params_input(curve, length)
+    time_best = float('inf')
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        geometry = geometries[curve]()
+        geometry.update(params_input, 'default')
+        mesh = road_mesh(geometry, lanes, length_broken_line)
+        vertices, edges, loops_vertex_index, polygons_loop_total, materials = \
+            mesh.get_mesh_arrays(max_deviation)
+        time_best = min(time_best, time.perf_counter() - time_start)
+    return time_best, len(vertices), len(polygons_loop_total)
+
+def compare_to_baseline(results, baseline, tolerance, tolerance_case):
+    '''
+        Return list of messages for a total time exceeding the baseline by
+        more than the tolerance, for single cases exceeding it by more than
+        the (larger, since short cases are noisy) case tolerance and for
+        cases with a different mesh size.
+    '''
+    messages = []
+    names = [name for name in results if name in baseline]
+    time_total = sum(results[name]['time'] for name in names)
+    time_total_baseline = sum(baseline[name]['time'] for name in names)
+    if time_total > time_total_baseline * (1.0 + tolerance):
+        messages.append('total: time {:.1f} ms, baseline {:.1f} ms'.format(
+            1000 * time_total, 1000 * time_total_baseline))
+    for name in names:
+        result = results[name]
+        result_baseline = baseline[name]
+        if result['time'] > result_baseline['time'] * (1.0 + tolerance_case):
+            messages.append('{}: time {:.2f} ms, baseline {:.2f} ms'.format(
+                name, 1000 * result['time'], 1000 * result_baseline['time']))
+        for key in ['vertices', 'faces']:
+            if result[key] != result_baseline[key]:
+                messages.append('{}: {} {}, baseline {}'.format(
+                    name, key, result[key], result_baseline[key]))
+    return messages
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the road meshing over all cross section presets.')
+    parser.add_argument('--baseline', type=pathlib.Path, default=baseline_default,
+        help='baseline file (default: %(default)s)')
+    parser.add_argument('--write-baseline', action='store_true',
+        help='write the results to the baseline file instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+        help='relative slowdown of the total time reported as regression (default: %(default)s)')
+    parser.add_argument('--tolerance-case', type=float, default=1.0,
+        help='relative slowdown of a single case reported as regression (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5,
+        help='number of repetitions of each case, the best time counts (default: %(default)s)')
+    parser.add_argument('--max-deviation', type=float, default=0.01,
+        help='maximum mesh deviation in m (default: %(default)s)')
+    parser.add_argument('--length-broken-line', type=float, default=3.0,
+        help='length of broken lines in m (default: %(default)s)')
+    parser.add_argument('--filter', default='',
+        help='only run cases with this string in their name')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if not args.write_baseline and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())['cases']
+    results = {}
+    print('{:<48} {:>10} {:>10} {:>10} {:>10}'.format('case', 'time [ms]', 'vertices', 'faces', 'baseline'))
+    for name, curve, length, lanes in get_cases():
+        if args.filter not in name:
+            continue
+        time_case, num_vertices, num_faces = run_case(curve, length, lanes,
+            args.length_broken_line, args.max_deviation, max(1, args.repeat))
+        results[name] = {'time': time_case, 'vertices': num_vertices, 'faces': num_faces}
+        if name in baseline:
+            ratio = '{:.2f}x'.format(time_case / baseline[name]['time'])
+        else:
+            ratio = '-'
+        print('{:<48} {:>10.2f} {:>10} {:>10} {:>10}'.format(
+            name, 1000 * time_case, num_vertices, num_faces, ratio))
+    print('Total time {:.1f} ms'.format(1000 * sum(result['time'] for result in results.values())))
+
+    if args.write_baseline:
+        args.baseline.write_text(json.dumps({
+            'max_deviation': args.max_deviation,
+            'length_broken_line': args.length_broken_line,
+            'cases': results,
+        }, indent=4) + '\n')
+        print('Baseline written to', args.baseline)
+        return 0
+    messages = compare_to_baseline(results, baseline, args.tolerance,
+        args.tolerance_case)
+    for message in messages:
+        print('REGRESSION', message)
+    return 1 if len(messages) > 0 else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+
+'''
+    Benchmark of the batch sampling of cross sections and elevation on 5 km
+    roads against sampling one s value at a time. Reports the time of both
+    and the largest position difference. Exits with code 1 if the positions
+    differ by more than the tolerance or if the batch time per sample grows
+    with the number of samples by more than the growth factor. Run it with
+    any Python 3 interpreter which has the add-on requirements installed:
+
+        python3 benchmarks/benchmark_sampling.py
+'''
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+# Importing the road meshing benchmark also imports the add-on as package
+from benchmark_road_mesh import geometries, get_params_input
+
+length = 5000.0
+
+# t values of a cross section with three lanes on each side
+t = np.array([-10.5, -7.0, -3.5, 0.0, 3.5, 7.0, 10.5])
+
+nums_samples = [1000, 10000, 100000]
+
+# Sampling one s value at a time is only timed up to this number of samples
+num_samples_scalar_max = 10000
+
+
+def sample_scalar(geometry, s):
+    '''
+        Sample cross sections and elevation one s value at a time.
+    '''
+    xyz = np.array([geometry.sample_cross_section(s_i, t)[0] for s_i in s.tolist()])
+    height = np.array([np.polyval([segment['d'], segment['c'], segment['b'], segment['a']], s_i)
+        for s_i, segment in ((s_i, geometry.get_elevation(s_i)) for s_i in s.tolist())])
+    return xyz, height
+
+def sample_batch(geometry, s):
+    '''
+        Sample cross sections and elevation for all s values at once.
+    '''
+    xyz, _ = geometry.sample_cross_section_batch(s, t)
+    height, _, _ = geometry.sample_elevation_batch(s)
+    return xyz, height
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the batch sampling of 5 km roads against sampling one s value at a time.')
+    parser.add_argument('--tolerance', type=float, default=1e-9,
+        help='maximum allowed position difference in m (default: %(default)s)')
+    parser.add_argument('--growth', type=float, default=2.0,
+        help='factor by which the batch time per sample may grow with the number of samples'
+            ' (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3,
+        help='number of repetitions of each case, the best time counts (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    messages = []
+    print('{:<12} {:>10} {:>12} {:>12} {:>8} {:>12}'.format('geometry', 'samples',
+        'scalar [ms]', 'batch [ms]', 'speedup', 'max dist'))
+    for curve, geometry_class in geometries.items():
+        geometry = geometry_class()
+        geometry.update(get_params_input(curve, length), 'default')
+        times_per_sample = []
+        for num_samples in nums_samples:
+            s = np.linspace(0.0, geometry.params['length'], num_samples)
+            time_batch = float('inf')
+            for _ in range(max(1, args.repeat)):
+                time_start = time.perf_counter()
+                xyz_batch, height_batch = sample_batch(geometry, s)
+                time_batch = min(time_batch, time.perf_counter() - time_start)
+            times_per_sample.append(time_batch / num_samples)
+            if num_samples > num_samples_scalar_max:
+                print('{:<12} {:>10} {:>12} {:>12.2f} {:>8} {:>12}'.format(curve, num_samples,
+                    '-', 1000 * time_batch, '-', '-'))
+                continue
+            time_start = time.perf_counter()
+            xyz_scalar, height_scalar = sample_scalar(geometry, s)
+            time_scalar = time.perf_counter() - time_start
+            dist_max = max(float(np.max(np.linalg.norm(xyz_batch - xyz_scalar, axis=-1))),
+                float(np.max(np.abs(height_batch - height_scalar))))
+            print('{:<12} {:>10} {:>12.2f} {:>12.2f} {:>7.1f}x {:>12.2e}'.format(curve, num_samples,
+                1000 * time_scalar, 1000 * time_batch, time_scalar / time_batch, dist_max))
+            if dist_max > args.tolerance:
+                messages.append('{} {} samples: positions differ by {:.2e} m'.format(
+                    curve, num_samples, dist_max))
+        if times_per_sample[-1] > args.growth * times_per_sample[0]:
+            messages.append('{}: batch time per sample grows from {:.2f} us to {:.2f} us'.format(
+                curve, 1e6 * times_per_sample[0], 1e6 * times_per_sample[-1]))
+
+    for message in messages:
+        print('REGRESSION', message)
+    return 1 if len(messages) > 0 else 0
+
+if __name__ == '__main__':
+    sys.exit(main())